@@ -15,18 +15,49 @@
 # You should have received a copy of the GNU General Public License
 # along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
 
-from .common import AlreadyBoundException, BadArgException, NoSuchPlaceholderException, NoSuchVariableException
-from .model import nocompile
-from .leaf import generic, LOCAL, turbo, T, U, V, W, X, Y, Z
+from .adaptive import Adaptive
+from .autotune import autotune
+from .common import AlreadyBoundException, BadArgException, CompileBudgetException, NoCastException, NoProfileException, NoSuchPlaceholderException, NoSuchVariableException, NotFusableException, NotReducibleException, NotSpecialisableException, NotStencilException, NotTileableException, NoTrainingException, PythonInLoopException, UnsupportedCompilerException
+from .fuse import fuse
+from .model import nocompile, State, Struct
+from .pgo import pgo
+from .policy import Policy
+from .ragged import Ragged
+from .sized import sized
+from .stream import Stream
+from .leaf import generic, LOCAL, REDUCE, STENCIL, turbo, T, U, V, W, X, Y, Z
 
+assert Adaptive
 assert AlreadyBoundException
+assert autotune
 assert BadArgException
+assert CompileBudgetException
+assert NoCastException
+assert NoProfileException
 assert NoSuchPlaceholderException
 assert NoSuchVariableException
+assert NotFusableException
+assert NotReducibleException
+assert NotSpecialisableException
+assert NotStencilException
+assert NotTileableException
+assert NoTrainingException
+assert PythonInLoopException
+assert fuse
 assert generic
 assert not LOCAL
 assert nocompile
+assert pgo
+assert Policy
+assert Ragged
+assert REDUCE
+assert sized
+assert State
+assert STENCIL
+assert Stream
+assert Struct
 assert turbo
+assert UnsupportedCompilerException
 assert T
 assert U
 assert V
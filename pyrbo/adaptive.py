@@ -0,0 +1,120 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NoSuchVariableException, NotSpecialisableException
+from .model import nocompile
+from collections import Counter
+from contextlib import nullcontext
+import ast, logging, numpy as np, threading, weakref
+
+log = logging.getLogger(__name__)
+
+class Adaptive: # Watches scalar args of a dynamic kernel and folds a dominant combination into its own variant.
+
+    def __init__(self, names, window = 100, dominance = .9, background = True):
+        self.names = list(names)
+        self.window = window
+        self.dominance = dominance
+        self.background = background
+        self.lock = threading.Lock()
+        self.indices = weakref.WeakKeyDictionary() # Per kernel, not by id which may be reused once a kernel is collected.
+        self.counters = weakref.WeakKeyDictionary()
+        self.totals = weakref.WeakKeyDictionary()
+        self.routes = weakref.WeakKeyDictionary()
+        self.threads = []
+        self.specialisations = 0
+
+    def _indices(self, decorated):
+        try:
+            return self.indices[decorated]
+        except KeyError:
+            pass
+        try:
+            body = decorated.body
+        except OSError:
+            self.indices[decorated] = None # No source, so nothing to specialise.
+            return
+        assigned = set(n.id for s in body for n in ast.walk(s) if isinstance(n, ast.Name) and not isinstance(n.ctx, ast.Load))
+        indices = []
+        for name in self.names:
+            if name not in decorated.paramnames:
+                raise NoSuchVariableException(name)
+            if name in assigned: # Folding would break the writes.
+                raise NotSpecialisableException(name)
+            indices.append(decorated.paramnames.index(name))
+        self.indices[decorated] = indices
+        return indices
+
+    def __call__(self, decorated, variant, args, kwargs, complete):
+        indices = self._indices(decorated)
+        if indices is None:
+            return complete
+        key = variant.suffix
+        values = tuple(args[i] if i < len(args) else kwargs.get(name) for name, i in zip(self.names, indices))
+        dominant = None
+        with self.lock: # Background compiles update the routes.
+            routes = self.routes.get(decorated, {}).get(key)
+            if routes is not None and values in routes:
+                specialised = routes[values]
+                return complete if specialised is None else specialised # Otherwise still compiling.
+            counter = self.counters.setdefault(decorated, {}).setdefault(key, Counter())
+            counter[values] += 1
+            totals = self.totals.setdefault(decorated, {})
+            total = totals[key] = totals.get(key, 0) + 1
+            if total >= self.window:
+                (values, count), = counter.most_common(1)
+                counter.clear()
+                totals[key] = 0
+                if count >= self.dominance * self.window and all(isinstance(v, (int, np.integer)) for v in values):
+                    routes = self.routes.setdefault(decorated, {}).setdefault(key, {})
+                    if values not in routes:
+                        routes[values] = None
+                        dominant = values
+        if dominant is not None:
+            self._specialise(decorated, variant, routes, dominant)
+        return complete
+
+    def _specialise(self, decorated, variant, routes, values):
+        svariant = variant.specialised(decorated, dict(zip(self.names, (int(v) for v in values))))
+        disabled = nocompile.depth() # Thread-local, so carried over to the worker.
+        def load():
+            try:
+                with nocompile if disabled else nullcontext():
+                    specialised = decorated.getcomplete(svariant) # Serialised with any other compile of this kernel.
+            except Exception:
+                log.exception("Failed to specialise %s, keeping the generic variant:", decorated.name)
+                with self.lock:
+                    del routes[values] # Allow another attempt.
+                return
+            with self.lock:
+                routes[values] = specialised
+                self.specialisations += 1
+        if self.background and not nocompile.preparing(): # Prepared sources are collected by the calling thread.
+            thread = threading.Thread(target = load, daemon = True)
+            thread.start()
+            with self.lock:
+                self.threads = [t for t in self.threads if t.is_alive()] # Finished ones need no wait.
+                self.threads.append(thread)
+        else:
+            load()
+
+    def wait(self):
+        while self.threads:
+            self.threads.pop().join()
+
+    def stats(self):
+        return dict(specialisations = self.specialisations, routes = sum(len(r) for d in self.routes.values() for r in d.values()))
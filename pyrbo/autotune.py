@@ -0,0 +1,49 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import isa
+from .model import Build, resolve
+from .unroll import Binary, CompilerUnroll, Remainder
+from itertools import product
+import ast, sys
+
+unrolls = Binary(), Binary(0x10), Remainder(4), Remainder(16), CompilerUnroll(8)
+flagsets = [], ['-O2'], ['-O3'] # Target CPU comes from the isa level, never -march=native which the cache can't key on.
+
+def _hasunroll(decorated):
+    return any(isinstance(node, ast.For) and isinstance(node.target, ast.Name) and 'UNROLL' == node.target.id
+            for statement in decorated.body for node in ast.walk(statement))
+
+def candidates(decorated):
+    level = isa.best(decorated.isas)
+    return [Build(unroll, flags, isa = level) for unroll, flags in product(unrolls if _hasunroll(decorated) else [decorated.unroll], flagsets)]
+
+def autotune(kernel, sample_args, candidates = candidates, timer = None):
+    if timer is None:
+        from .bench import Timer
+        timer = Timer(3, 11)
+    decorated, variant = resolve(kernel, sample_args)
+    best = None
+    for build in candidates(decorated) if callable(candidates) else candidates:
+        complete = decorated.CompleteInfo(variant, build).load()
+        median = timer(lambda: complete(*sample_args)).median()
+        print('Timed:', build, f"{median:.0f} ns", file = sys.stderr)
+        if best is None or median < best[0]:
+            best = median, build, complete
+    _, build, complete = best
+    decorated.savetuned(variant, build, complete)
+    return complete
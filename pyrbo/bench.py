@@ -0,0 +1,275 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import turbo, T
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter_ns
+import json, math, numpy as np, os, platform, subprocess, sys
+
+@turbo(types = dict(x = T), dynamic = True)
+def noop(x):
+    return x
+
+@turbo(types = dict(v = [T]), dynamic = True)
+def touch(v):
+    pass
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T], out = [T]), dynamic = True)
+def tsum(n, x, y, out):
+    for i in range(n):
+        out[i] = x[i] + y[i]
+
+unrollsource = '''from pyrbo import turbo
+from pyrbo.unroll import Binary, CompilerUnroll, Remainder
+import numpy as np
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32), unroll = %s)
+def triple(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+'''
+
+compilesource = '''from pyrbo import turbo
+import numpy as np
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32), dynamic = True)
+def triple(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc += 3
+    return acc
+'''
+
+manysource = '''from pyrbo import turbo, T
+import numpy as np
+%s'''
+
+manydef = '''
+@turbo(types = dict(n = np.uint32, x = [T], i = np.uint32), dynamic = True)
+def f%s(n, x):
+    for i in range(n):
+        x[i] += 1
+'''
+
+class Stats:
+
+    z = 1.96
+
+    def __init__(self, samples):
+        self.samples = sorted(samples)
+
+    def median(self):
+        n = len(self.samples)
+        return (self.samples[(n - 1) // 2] + self.samples[n // 2]) / 2
+
+    def ci(self):
+        # Distribution-free interval for the median from order statistics:
+        n = len(self.samples)
+        halfwidth = self.z * math.sqrt(n) / 2
+        return self.samples[max(0, math.floor(n / 2 - halfwidth))], self.samples[min(n - 1, math.ceil(n / 2 + halfwidth) - 1)]
+
+    def todict(self):
+        low, high = self.ci()
+        return dict(median = self.median(), low = low, high = high, n = len(self.samples))
+
+class Timer:
+
+    def __init__(self, warmups, repeats):
+        self.warmups = warmups
+        self.repeats = repeats
+
+    def _number(self, f):
+        number = 1
+        while True:
+            mark = perf_counter_ns()
+            for _ in range(number):
+                f()
+            if perf_counter_ns() - mark >= 1_000_000:
+                return number
+            number *= 2
+
+    def __call__(self, f):
+        for _ in range(self.warmups):
+            f()
+        number = self._number(f)
+        samples = []
+        for _ in range(self.repeats):
+            mark = perf_counter_ns()
+            for _ in range(number):
+                f()
+            samples.append((perf_counter_ns() - mark) / number)
+        return Stats(samples)
+
+    def once(self, f, repeats = None):
+        samples = []
+        for _ in range(self.repeats if repeats is None else repeats):
+            mark = perf_counter_ns()
+            f()
+            samples.append(perf_counter_ns() - mark)
+        return Stats(samples)
+
+class Suite:
+
+    maxexp = 6
+    unrollstrategies = 'Binary()', 'Binary(0x10)', 'Remainder(8)', 'CompilerUnroll(8)'
+    unrolltrips = 100000
+    manydefs = 100
+
+    def __init__(self, timer, subprocessrepeats):
+        self.timer = timer
+        self.subprocessrepeats = subprocessrepeats
+        self.env = dict(os.environ, PYTHONPATH = os.pathsep.join(p for p in [str(Path(__file__).parent.parent), os.environ.get('PYTHONPATH')] if p)) # Subprocesses import this checkout, and dependencies as before.
+
+    def dispatch(self):
+        f = noop[T, np.float64]
+        yield 'dispatch.bound', self.timer(lambda: f(1.5))
+        yield 'dispatch.dynamic', self.timer(lambda: noop(1.5))
+
+    def arraycall(self):
+        v = np.zeros(1, dtype = np.float32)
+        f = touch[T, np.float32]
+        yield 'arraycall.bound', self.timer(lambda: f(v))
+        yield 'arraycall.dynamic', self.timer(lambda: touch(v))
+
+    def throughput(self):
+        f = tsum[T, np.float32]
+        for exp in range(self.maxexp + 1):
+            size = 10 ** exp
+            x = np.arange(size, dtype = np.float32)
+            y = np.arange(size, dtype = np.float32) * 2
+            out = np.empty(size, dtype = np.float32)
+            yield f"throughput.tsum.{size}", self.timer(lambda: f(size, x, y, out))
+            yield f"throughput.numpy.{size}", self.timer(lambda: np.add(x, y, out = out))
+
+    @contextmanager
+    def _importer(self):
+        counter = iter(range(sys.maxsize))
+        with TemporaryDirectory() as tempdir:
+            sys.path.insert(0, tempdir)
+            try:
+                def load(source):
+                    modulename = f"pyrbobench{os.getpid()}_{next(counter)}"
+                    (Path(tempdir) / f"{modulename}.py").write_text(source)
+                    return __import__(modulename)
+                yield load
+            finally:
+                sys.path.remove(tempdir)
+
+    def compile(self):
+        with self._importer() as load:
+            yield 'compile', self.timer.once(lambda: load(compilesource).triple(7))
+
+    def unroll(self):
+        with self._importer() as load:
+            for strategy in self.unrollstrategies:
+                source = unrollsource % strategy
+                yield f"unroll.{strategy}.compile", self.timer.once(lambda: load(source), self.subprocessrepeats)
+                triple = load(source).triple
+                yield f"unroll.{strategy}.run", self.timer(lambda: triple(self.unrolltrips))
+
+    def importlatency(self):
+        def run(code):
+            subprocess.check_call([sys.executable, '-c', code], env = self.env)
+        yield 'import.python', self.timer.once(lambda: run('pass'), self.subprocessrepeats)
+        yield 'import.pyrbo', self.timer.once(lambda: run('import pyrbo'), self.subprocessrepeats)
+
+    def importtime(self):
+        def cumulative(code, modulename, env):
+            stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env = env, stderr = subprocess.PIPE, check = True, text = True).stderr
+            for line in stderr.splitlines():
+                fields = line.split('|')
+                if 3 == len(fields) and modulename == fields[2].strip():
+                    return int(fields[1]) * 1000 # Reported in microseconds, Stats are in ns.
+            raise Exception(modulename)
+        with TemporaryDirectory() as tempdir:
+            (Path(tempdir) / 'pyrbomany.py').write_text(manysource % ''.join(manydef % i for i in range(self.manydefs)))
+            env = dict(self.env, PYTHONPATH = os.pathsep.join([self.env['PYTHONPATH'], tempdir]))
+            yield 'importtime.pyrbo', Stats([cumulative('import pyrbo', 'pyrbo', env) for _ in range(self.subprocessrepeats)])
+            yield 'importtime.many', Stats([cumulative('import pyrbomany', 'pyrbomany', env) for _ in range(self.subprocessrepeats)])
+
+    def run(self, names):
+        results = {}
+        for name in names:
+            for key, stats in getattr(self, name)():
+                print(f"{key}: {stats.median():.0f} ns", file = sys.stderr)
+                results[key] = stats.todict()
+        return results
+
+    names = ['dispatch', 'arraycall', 'throughput', 'compile', 'unroll', 'importlatency', 'importtime']
+
+def pin():
+    if hasattr(os, 'sched_setaffinity'):
+        cpu = min(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpu})
+        return cpu
+
+def meta(cpu):
+    from Cython import __version__ as cythonversion
+    return dict(python = platform.python_version(), numpy = np.__version__, cython = cythonversion,
+            machine = platform.machine(), processor = platform.processor(), cpu = cpu)
+
+def compare(old, new):
+    regressions = []
+    for key in sorted(old['results'].keys() & new['results'].keys()):
+        o = old['results'][key]
+        n = new['results'][key]
+        verdict = ''
+        if n['low'] > o['high']:
+            verdict = 'SLOWER'
+            regressions.append(key)
+        elif n['high'] < o['low']:
+            verdict = 'faster'
+        print(f"{key}: {o['median']:.0f} -> {n['median']:.0f} ns ({n['median'] / o['median']:.3f}x) {verdict}".rstrip())
+    return regressions
+
+def main():
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest = 'command', required = True)
+    runparser = subparsers.add_parser('run')
+    runparser.add_argument('--out', '-o')
+    runparser.add_argument('--warmups', type = int, default = 5)
+    runparser.add_argument('--repeats', type = int, default = 31)
+    runparser.add_argument('--subprocessrepeats', type = int, default = 11)
+    runparser.add_argument('--nopin', action = 'store_true')
+    runparser.add_argument('names', nargs = '*')
+    compareparser = subparsers.add_parser('compare')
+    compareparser.add_argument('old')
+    compareparser.add_argument('new')
+    args = parser.parse_args()
+    if 'run' == args.command:
+        for name in args.names:
+            if name not in Suite.names:
+                parser.error(f"unknown benchmark: {name}")
+        cpu = None if args.nopin else pin()
+        results = Suite(Timer(args.warmups, args.repeats), args.subprocessrepeats).run(args.names or Suite.names)
+        text = json.dumps(dict(meta = meta(cpu), results = results), indent = 2, sort_keys = True)
+        if args.out is None:
+            print(text)
+        else:
+            Path(args.out).write_text(text)
+    else:
+        regressions = compare(*(json.loads(Path(p).read_text()) for p in [args.old, args.new]))
+        sys.exit(1 if regressions else 0)
+
+if '__main__' == __name__:
+    import pyrbo.bench # Otherwise the kernels would belong to __main__.
+    pyrbo.bench.main()
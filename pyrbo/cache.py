@@ -0,0 +1,103 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import isa
+from contextlib import contextmanager
+from hashlib import md5
+from importlib.machinery import EXTENSION_SUFFIXES
+from itertools import chain
+from pathlib import Path
+import numpy as np, os, platform, shlex, shutil, subprocess, sys, sysconfig, threading
+
+def cachedir(): # Empty to disable.
+    path = os.environ.get('PYRBO_CACHE', str(Path.home() / '.cache' / 'pyrbo'))
+    return Path(path) if path else None
+
+def builddir(): # For example somewhere in tmpfs.
+    return os.environ.get('PYRBO_BUILD_DIR') or None
+
+def compiler(): # As distutils would resolve it.
+    return os.environ.get('CC') or sysconfig.get_config_var('CC') or ''
+
+compilertoversion = {}
+
+def compilerversion(): # Banner of the resolved compiler, empty if it can't be run.
+    cc = compiler()
+    try:
+        return compilertoversion[cc]
+    except KeyError:
+        pass
+    try:
+        text = subprocess.run([*shlex.split(cc), '--version'], stdout = subprocess.PIPE, stderr = subprocess.DEVNULL, universal_newlines = True).stdout
+    except OSError:
+        text = ''
+    compilertoversion[cc] = text
+    return text
+
+def key(fqmodulename, *texts): # Any isa flags are in the pyxbld text.
+    from Cython import __version__
+    h = md5()
+    host = ' '.join(sorted(isa.cpuflags())) if any('-march=native' in text for text in texts) else '' # Such a binary only suits this CPU.
+    for text in chain((fqmodulename, __version__, sys.version, EXTENSION_SUFFIXES[0], np.__version__, platform.machine(), compiler(), compilerversion(), host), texts):
+        h.update(text.encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+def fetch(key, target):
+    parent = cachedir()
+    if parent is None:
+        return False
+    try:
+        _copy(parent / f"{key}{EXTENSION_SUFFIXES[0]}", target)
+    except FileNotFoundError:
+        return False
+    return True
+
+def store(key, source):
+    parent = cachedir()
+    if parent is not None:
+        parent.mkdir(parents = True, exist_ok = True)
+        _copy(source, parent / f"{key}{EXTENSION_SUFFIXES[0]}")
+
+def _copy(source, target):
+    temp = target.with_name(f".{target.name}.{os.getpid()}")
+    shutil.copyfile(source, temp)
+    os.replace(temp, target) # Atomic so that concurrent processes never see a partial file.
+
+def compilerwrapper():
+    if os.environ.get('PYRBO_CCACHE', '1') != '0':
+        return shutil.which('ccache')
+
+envlock = threading.RLock() # CC is process-wide, and kernels compile in their own threads.
+
+@contextmanager
+def compilerenv():
+    with envlock:
+        wrapper = compilerwrapper()
+        previous = os.environ.get('CC')
+        cc = compiler() or None
+        if wrapper is None or cc is None or 'ccache' in cc:
+            yield
+            return
+        os.environ['CC'] = f"{wrapper} {cc}" # Picked up by distutils customize_compiler.
+        try:
+            yield
+        finally:
+            if previous is None:
+                del os.environ['CC']
+            else:
+                os.environ['CC'] = previous
@@ -39,3 +39,58 @@ class NotDynamicException(Exception):
 
     def __init__(self, name):
         super().__init__(name)
+
+class NotFusableException(Exception):
+
+    def __init__(self, name):
+        super().__init__(name)
+
+class PythonInLoopException(Exception):
+
+    def __init__(self, name, location, text):
+        super().__init__(name, location, text)
+
+class NotReducibleException(Exception):
+
+    def __init__(self, text, reason):
+        super().__init__(text, reason)
+
+class NotTileableException(Exception):
+
+    def __init__(self, text):
+        super().__init__(text)
+
+class NotStencilException(Exception):
+
+    def __init__(self, text):
+        super().__init__(text)
+
+class CompileBudgetException(Exception):
+
+    def __init__(self, name, suffix):
+        super().__init__(name, suffix)
+
+class NoCastException(Exception):
+
+    def __init__(self, name, t):
+        super().__init__(name, t)
+
+class NotSpecialisableException(Exception):
+
+    def __init__(self, name):
+        super().__init__(name)
+
+class NoProfileException(Exception):
+
+    def __init__(self, groupname):
+        super().__init__(groupname)
+
+class NoTrainingException(Exception):
+
+    def __init__(self, name):
+        super().__init__(name)
+
+class UnsupportedCompilerException(Exception):
+
+    def __init__(self, compiler):
+        super().__init__(compiler)
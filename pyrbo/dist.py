@@ -0,0 +1,48 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import leaf
+from .model import nocompile
+from importlib import import_module
+from pathlib import Path
+import json, numpy as np, runpy
+
+manifestname = 'pyrbo.json' # Maps module name (relative to the package) to kernel name to list of placeholder bindings.
+
+def _bind(kernel, binding):
+    if not binding: # Already complete, possibly since before we started collecting.
+        kernel.info.getcomplete(kernel.info.variant)
+    for name, arg in sorted(binding.items()):
+        kernel = kernel[getattr(leaf, name), np.dtype(arg).type if isinstance(arg, str) else arg]
+
+def _extension(fqmodulename, pyxpath):
+    return runpy.run_path(str(pyxpath.with_suffix('.pyxbld')))['make_ext'](fqmodulename, str(pyxpath)) # Same as pyximport would.
+
+def prepare(package, manifest = None):
+    if manifest is None:
+        manifest = json.loads((Path(import_module(package).__file__).parent / manifestname).read_text())
+    with nocompile.collect() as prepared:
+        for modulename, kernels in manifest.items():
+            module = import_module(f"{package}.{modulename}")
+            for kernelname, bindings in kernels.items():
+                for binding in bindings:
+                    _bind(getattr(module, kernelname), binding)
+    return [_extension(*item) for item in sorted(prepared.items())]
+
+def extensions(*packages): # For setup(ext_modules = ...), so that the wheel bundles the binaries.
+    from Cython.Build import cythonize
+    return cythonize([e for package in packages for e in prepare(package)], include_path = [np.get_include()], quiet = True)
@@ -0,0 +1,217 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from copy import deepcopy
+import ast, operator, textwrap
+
+def parsefunction(pyfunc):
+    import inspect # Slow to import and only needed to compile.
+    tree = ast.parse(textwrap.dedent(inspect.getsource(pyfunc)))
+    ast.increment_lineno(tree, pyfunc.__code__.co_firstlineno - 1)
+    functiondef, = tree.body
+    functiondef.body = [s for s in functiondef.body if not islocal(s)]
+    return functiondef
+
+def islocal(statement):
+    return isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Name) and 'LOCAL' == statement.value.id
+
+def transform(body, passes, consts):
+    body = deepcopy(body)
+    for p in passes:
+        body = p(body, consts)
+    return body
+
+def ensurenonempty(body, node):
+    return body if body else [ast.copy_location(ast.Pass(), node)]
+
+class Line:
+
+    def __init__(self, text, location = None, inloop = False):
+        self.text = text
+        self.location = location
+        self.inloop = inloop
+
+class Emitter:
+
+    indentunit = ' ' * 4
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lines = []
+
+    def _line(self, depth, text, node, inloop):
+        location = None if self.filename is None or not hasattr(node, 'lineno') else f"{self.filename}:{node.lineno}"
+        self.lines.append(Line(f"{self.indentunit * depth}{text}", location, inloop))
+
+    def block(self, body, depth, inloop = False):
+        for statement in body:
+            self.statement(statement, depth, inloop)
+
+    def statement(self, node, depth, inloop):
+        if isinstance(node, ast.For):
+            self._line(depth, f"for {ast.unparse(node.target)} in {ast.unparse(node.iter)}:", node, True)
+            self.block(node.body, depth + 1, True)
+            self._orelse(node, depth, inloop)
+        elif isinstance(node, ast.While):
+            self._line(depth, f"while {ast.unparse(node.test)}:", node, True)
+            self.block(node.body, depth + 1, True)
+            self._orelse(node, depth, inloop)
+        elif isinstance(node, ast.If):
+            self._if(node, depth, inloop, 'if')
+        else:
+            for text in ast.unparse(node).splitlines():
+                self._line(depth, text, node, inloop)
+
+    def _if(self, node, depth, inloop, keyword):
+        self._line(depth, f"{keyword} {ast.unparse(node.test)}:", node, inloop)
+        self.block(node.body, depth + 1, inloop)
+        if 1 == len(node.orelse) and isinstance(node.orelse[0], ast.If):
+            self._if(node.orelse[0], depth, inloop, 'elif')
+        else:
+            self._orelse(node, depth, inloop)
+
+    def _orelse(self, node, depth, inloop):
+        if node.orelse:
+            self._line(depth, 'else:', node, inloop)
+            self.block(node.orelse, depth + 1, inloop)
+
+class Pass(ast.NodeTransformer):
+
+    declared = {}
+
+    def __call__(self, body, consts):
+        self.consts = consts
+        return self._block(body)
+
+    def _block(self, body):
+        result = []
+        for statement in body:
+            statement = self.visit(statement)
+            if isinstance(statement, list):
+                result.extend(statement)
+            elif statement is not None:
+                result.append(statement)
+        return result
+
+class WriteBack(Pass):
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __call__(self, body, consts):
+        body = super().__call__(body, consts)
+        if self.lines and body and not isinstance(body[-1], ast.Return):
+            body.extend(self._statements(body[-1]))
+        return body
+
+    def _statements(self, node):
+        statements = ast.parse('\n'.join(self.lines)).body
+        for s in statements:
+            for n in ast.walk(s):
+                ast.copy_location(n, node)
+        return statements
+
+    def visit_Return(self, node):
+        return self._statements(node) + [node]
+
+class FoldConsts(Pass):
+
+    literaltypes = bool, int, float, complex, str, bytes
+    intlimit = 1 << 31
+    binops = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.BitAnd: operator.and_,
+        ast.BitOr: operator.or_,
+        ast.BitXor: operator.xor,
+    }
+    unaryops = {
+        ast.USub: operator.neg,
+        ast.UAdd: operator.pos,
+        ast.Not: operator.not_,
+        ast.Invert: operator.invert,
+    }
+    cmpops = {
+        ast.Eq: operator.eq,
+        ast.NotEq: operator.ne,
+        ast.Lt: operator.lt,
+        ast.LtE: operator.le,
+        ast.Gt: operator.gt,
+        ast.GtE: operator.ge,
+    }
+
+    def _constant(self, value, node):
+        if int == type(value) and abs(value) >= self.intlimit:
+            return node # Python int arithmetic doesn't wrap like C.
+        return ast.copy_location(ast.Constant(value), node)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load) and node.id in self.consts and type(self.consts[node.id]) in self.literaltypes:
+            return ast.copy_location(ast.Constant(self.consts[node.id]), node)
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        f = self.binops.get(type(node.op))
+        if f is not None and isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+            return self._constant(f(node.left.value, node.right.value), node)
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        f = self.unaryops.get(type(node.op))
+        if f is not None and isinstance(node.operand, ast.Constant):
+            return self._constant(f(node.operand.value), node)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = [node.left] + node.comparators
+        if all(isinstance(o, ast.Constant) for o in operands) and all(type(op) in self.cmpops for op in node.ops):
+            return self._constant(all(self.cmpops[type(op)](l.value, r.value) for op, l, r in zip(node.ops, operands, operands[1:])), node)
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        if all(isinstance(v, ast.Constant) for v in node.values):
+            return self._constant((all if isinstance(node.op, ast.And) else any)(v.value for v in node.values), node)
+        return node
+
+class EliminateDeadBranches(Pass):
+
+    def generic_visit(self, node):
+        super().generic_visit(node)
+        if isinstance(getattr(node, 'body', None), list):
+            node.body = ensurenonempty(node.body, node)
+        return node
+
+    def visit_If(self, node):
+        if isinstance(node.test, ast.Constant):
+            return self._block(node.body if node.test.value else node.orelse)
+        return self.generic_visit(node)
+
+    def visit_While(self, node):
+        if isinstance(node.test, ast.Constant) and not node.test.value:
+            return self._block(node.orelse)
+        return self.generic_visit(node)
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.test, ast.Constant):
+            return node.body if node.test.value else node.orelse
+        return node
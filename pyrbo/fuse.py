@@ -0,0 +1,102 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import AlreadyBoundException, NotFusableException
+from .model import Decorated, GroupSets, partialorcomplete, resolve, Variant
+from copy import deepcopy
+from itertools import chain
+import ast
+
+def _loop(decorated):
+    body = [s for s in decorated.body if not (isinstance(s, ast.Expr) and isinstance(s.value, ast.Constant))]
+    if 1 != len(body):
+        raise NotFusableException(decorated.name)
+    loop, = body
+    if not (isinstance(loop, ast.For) and isinstance(loop.iter, ast.Call) and isinstance(loop.iter.func, ast.Name) and 'range' == loop.iter.func.id) or loop.orelse:
+        raise NotFusableException(decorated.name)
+    if any(isinstance(node, (ast.Return, ast.Yield, ast.YieldFrom, ast.Break)) for node in ast.walk(loop)):
+        raise NotFusableException(decorated.name)
+    return loop
+
+def _header(loop):
+    return ast.dump(loop.target), ast.dump(loop.iter)
+
+def _subscripts(loop, ctx):
+    return [n for n in ast.walk(loop) if isinstance(n, ast.Subscript) and isinstance(n.ctx, ctx) and isinstance(n.value, ast.Name)]
+
+class Fused(Decorated):
+
+    def __init__(self, pairs):
+        loops = [_loop(d) for d, _ in pairs]
+        first = loops[0]
+        for (d, _), loop in zip(pairs, loops):
+            if _header(loop) != _header(first):
+                raise NotFusableException(d.name)
+        touched = set()
+        written = set()
+        readelsewhere = set()
+        writtenelsewhere = set()
+        for (d, _), loop in zip(pairs, loops): # Fused, an earlier kernel has only seen the current element.
+            target = ast.dump(loop.target).replace('Store', 'Load')
+            def names(ctx, elsewhere):
+                return set(n.value.id for n in _subscripts(loop, ctx) if not elsewhere or ast.dump(n.slice) != target)
+            loads, stores = names(ast.Load, False), names(ast.Store, False)
+            loadselsewhere, storeselsewhere = names(ast.Load, True), names(ast.Store, True)
+            if (written & loadselsewhere or readelsewhere & stores
+                    or writtenelsewhere & (loads | stores) or touched & storeselsewhere): # Another element of the array is in flux.
+                raise NotFusableException(d.name)
+            touched |= loads | stores
+            written |= stores
+            readelsewhere |= loadselsewhere
+            writtenelsewhere |= storeselsewhere
+        paramnames = []
+        localnames = []
+        nametotypespec = {}
+        groupsets = {}
+        for d, _ in pairs:
+            for name in d.paramnames:
+                if name not in paramnames:
+                    paramnames.append(name)
+            for name in d.localnames:
+                if name not in localnames:
+                    localnames.append(name)
+            for name, typespec in d.nametotypespec.items():
+                if nametotypespec.setdefault(name, typespec) != typespec:
+                    raise NotFusableException(name)
+            for param, groups in d.groupsets.groupsets.items():
+                groupsets.setdefault(param, groups)
+        self.paramnames = paramnames
+        self.localnames = [n for n in localnames if n not in paramnames]
+        self.fqmodule = pairs[0][0].fqmodule
+        self.name = 'THEN'.join(d.name for d, _ in pairs)
+        fusedloop = deepcopy(first)
+        fusedloop.body = [deepcopy(s) for loop in loops for s in loop.body]
+        self.body = [fusedloop]
+        filenames = set(d.filename for d, _ in pairs)
+        self.filename = filenames.pop() if 1 == len(filenames) else None
+        self._setup(nametotypespec, any(d.dynamic for d, _ in pairs), GroupSets(groupsets), None, any(d.strict for d, _ in pairs), pairs[0][0].unroll, pairs[0][0].isas, all(d.consolidate for d, _ in pairs), dict(chain.from_iterable(d.outputs.items() for d, _ in pairs)), pairs[0][0].maxvariants, pairs[0][0].policy, pairs[0][0].adaptive)
+
+def fuse(*kernels):
+    pairs = [(decorated, variant.paramtoarg) for decorated, variant in map(resolve, kernels)]
+    paramtoarg = {}
+    for _, pta in pairs:
+        for param, arg in pta.items():
+            current = paramtoarg.setdefault(param, arg)
+            if current.unwrap() != arg.unwrap():
+                raise AlreadyBoundException(param, current.unwrap(), arg.unwrap())
+    decorated = Fused(pairs)
+    return partialorcomplete(decorated, Variant(decorated, paramtoarg))
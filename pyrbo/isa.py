@@ -0,0 +1,64 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+import platform, re
+
+# Each level requires its own features plus those of the levels before it:
+levels = [
+    ('x86-64', set()),
+    ('x86-64-v2', {'cx16', 'lahf_lm', 'popcnt', 'pni', 'sse4_1', 'sse4_2', 'ssse3'}),
+    ('x86-64-v3', {'abm', 'avx', 'avx2', 'bmi1', 'bmi2', 'f16c', 'fma', 'movbe', 'xsave'}),
+    ('x86-64-v4', {'avx512bw', 'avx512cd', 'avx512dq', 'avx512f', 'avx512vl'}),
+]
+names = [name for name, _ in levels]
+
+def _cpuinfo(field):
+    try:
+        text = Path('/proc/cpuinfo').read_text()
+    except OSError:
+        return
+    m = re.search(f"^{field}\\s*:(.*)$", text, re.MULTILINE)
+    return None if m is None else m.group(1)
+
+def cpuflags():
+    text = _cpuinfo('flags')
+    return set() if text is None else set(text.split())
+
+def cpumodel(): # Falls back to what the platform module knows, e.g. off Linux.
+    text = _cpuinfo('model name')
+    return platform.processor() if text is None else text.strip()
+
+def supported(flags = None):
+    if platform.machine() not in {'x86_64', 'AMD64'}:
+        return []
+    if flags is None:
+        flags = cpuflags()
+    result = []
+    required = set()
+    for name, features in levels:
+        required |= features
+        if not required <= flags:
+            break
+        result.append(name)
+    return result
+
+def best(isas, flags = None): # None means a plain build.
+    available = set(supported(flags)).intersection(isas)
+    for name in reversed(names):
+        if name in available:
+            return name
@@ -16,20 +16,36 @@
 # along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
 
 from .common import AlreadyBoundException, NoSuchPlaceholderException
+from .isa import names
 from .model import Decorator, Obj, Partial, Placeholder, Type
-import initnative
+from .unroll import Binary
+import os
 
-del initnative
 globals().update([p.name, p] for p in (Placeholder(chr(i)) for i in range(ord('T'), ord('Z') + 1)))
 LOCAL = None
 
+def REDUCE(n, **kwargs): # Marks a reduction loop whose op must be associative and commutative, as lanes and blocks reorder it.
+    return range(n)
+
+def STENCIL(n, radius, **kwargs): # Marks a stencil loop, see the stencil module.
+    return range(n)
+
 def turbo(**kwargs):
     if 'types' not in kwargs:
         kwargs = dict(types = kwargs)
     nametotypespec = kwargs['types']
     dynamic = kwargs.get('dynamic', False)
     groupsets = kwargs.get('groupsets', {})
-    return Decorator(nametotypespec, dynamic, groupsets)
+    returns = kwargs.get('returns')
+    strict = kwargs.get('strict', bool(os.environ.get('PYRBO_STRICT')))
+    unroll = kwargs.get('unroll', Binary())
+    isas = kwargs.get('isas', ())
+    consolidate = kwargs.get('consolidate', bool(os.environ.get('PYRBO_CONSOLIDATE')))
+    outputs = kwargs.get('outputs', {})
+    maxvariants = kwargs.get('maxvariants', int(os.environ['PYRBO_MAXVARIANTS']) if os.environ.get('PYRBO_MAXVARIANTS') else None) # Bounds the loaded variants per kernel, not the files on disk, see prune.
+    policy = kwargs.get('policy')
+    adaptive = kwargs.get('adaptive')
+    return Decorator(nametotypespec, dynamic, groupsets, returns, strict, unroll, names if isas is True else isas, consolidate, outputs, maxvariants, policy, adaptive)
 
 class ClassVariant:
 
@@ -15,17 +15,41 @@
 # You should have received a copy of the GNU General Public License
 # along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
 
-from .common import AlreadyBoundException, BadArgException, NoSuchPlaceholderException, NoSuchVariableException, NotDynamicException
-from .unroll import unroll
+from .common import AlreadyBoundException, BadArgException, NoSuchPlaceholderException, NoSuchVariableException, NotDynamicException, PythonInLoopException
+from . import isa, pool
+from .frontend import EliminateDeadBranches, Emitter, FoldConsts, Line, parsefunction, transform, WriteBack
+from .reduce import Reduce
+from .stencil import Stencil
+from .tile import Tile
+from .unroll import isgcc, parsestrategy, Unroll
 from diapyr.util import innerclass, singleton
-from functools import total_ordering
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import cached_property, total_ordering
+from hashlib import md5
 from importlib import import_module
+from importlib.machinery import EXTENSION_SUFFIXES
 from itertools import chain, product
 from pathlib import Path
-import inspect, logging, re, sys, threading
+import ast, json, logging, numpy as np, os, platform, re, shutil, sys, threading, time
 
 log = logging.getLogger(__name__)
 threadstate = threading.local()
+ctypenames = {
+    'b': 'signed char',
+    'B': 'unsigned char',
+    'h': 'short',
+    'H': 'unsigned short',
+    'i': 'int',
+    'I': 'unsigned int',
+    'l': 'long',
+    'L': 'unsigned long',
+    'q': 'long long',
+    'Q': 'unsigned long long',
+    'f': 'float',
+    'd': 'double',
+    'g': 'long double',
+}
 
 @singleton
 class nocompile:
@@ -39,6 +63,74 @@ class nocompile:
     def __exit__(self, *exc_info):
         threadstate.compiledisabled -= 1
 
+    def preparing(self):
+        return hasattr(threadstate, 'prepared')
+
+    def prepared(self, fqmodulename, pyxpath):
+        print('Prepared:', pyxpath.stem, file=sys.stderr)
+        if self.preparing():
+            threadstate.prepared[fqmodulename] = pyxpath
+
+    @contextmanager
+    def collect(self): # Regenerate sources even where binaries exist, and gather them.
+        threadstate.prepared = prepared = {}
+        try:
+            with self:
+                yield prepared
+        finally:
+            del threadstate.prepared
+
+def machine(): # The hardware, not the hostname, so containers share tunings and different CPUs don't.
+    return f"{platform.machine()}-{md5(' '.join([isa.cpumodel(), *sorted(isa.cpuflags())]).encode()).hexdigest()[:8]}"
+
+class Build:
+
+    def __init__(self, unroll, flags = (), profile = None, training = False, isa = None):
+        self.unroll = unroll
+        self.flags = list(flags)
+        self.profile = profile # Digest of the training calls, if any.
+        self.training = training # Not part of the identity, the instrumented build is replaced in place.
+        self.isa = isa
+
+    def compileargs(self):
+        return ([] if self.isa is None else [f"-march={self.isa}"]) + self.flags + self.unroll.compileargs()
+
+    def profileargs(self, profiledir):
+        if self.profile is None or not isgcc(): # Other compilers have their own profile format.
+            return []
+        if self.training:
+            return [f"-fprofile-generate={profiledir}"]
+        return [f"-fprofile-use={profiledir}", '-fprofile-correction'] # GCC warns if the profile is missing.
+
+    def linkargs(self, profiledir):
+        return self.profileargs(profiledir) if self.training else []
+
+    def trained(self):
+        return type(self)(self.unroll, self.flags, self.profile, isa = self.isa)
+
+    def suffix(self):
+        return f"_{md5(repr(self).encode()).hexdigest()[:8]}"
+
+    def todict(self):
+        d = dict(unroll = repr(self.unroll), flags = self.flags)
+        if self.profile is not None:
+            d['profile'] = self.profile
+        if self.isa is not None:
+            d['isa'] = self.isa
+        return d
+
+    @classmethod
+    def fromdict(cls, d):
+        return cls(parsestrategy(d['unroll']), d['flags'], d.get('profile'), isa = d.get('isa'))
+
+    def __repr__(self):
+        args = [repr(self.unroll), repr(self.flags)]
+        if self.profile is not None:
+            args.append(repr(self.profile))
+        if self.isa is not None:
+            args.append(f"isa = {self.isa!r}")
+        return f"{type(self).__name__}({', '.join(args)})"
+
 class GroupSets:
 
     def __init__(self, groupsets):
@@ -59,7 +151,7 @@ class Placeholder:
         return self.name < that.name
 
     def __eq__(self, that):
-        return self.name == that.name
+        return type(self) == type(that) and self.name == that.name
 
     def __hash__(self):
         return hash(self.name)
@@ -95,6 +187,9 @@ class Type(Arg):
     def typename(self):
         return self.t.__name__
 
+    def ctypename(self):
+        return ctypenames[np.dtype(self.t).char]
+
     def discriminator(self):
         return self.typename()
 
@@ -105,7 +200,7 @@ class Type(Arg):
         return self.t < that.t # FIXME LATER: Does not work.
 
     def __eq__(self, that):
-        return self.t == that.t
+        return type(self) == type(that) and self.t == that.t
 
     def __hash__(self):
         return hash(self.t)
@@ -137,9 +232,10 @@ class Obj(Arg):
 
 class CDef:
 
-    def __init__(self, name, text):
+    def __init__(self, name, text, optional = False):
         self.name = name
         self.text = text
+        self.optional = optional # Only emitted if the body refers to the name.
 
     def __str__(self):
         return self.text
@@ -149,6 +245,7 @@ class Array:
     def __init__(self, elementtypespec, ndim):
         self.ndimtext = f", ndim={ndim}" if 1 != ndim else ''
         self.zeros = ', '.join(['0'] * ndim)
+        self.ndim = ndim
         self.elementtypespec = elementtypespec
 
     def ispotentialconst(self):
@@ -163,6 +260,7 @@ class Array:
         elementtypename = self.elementtypespec.resolvedarg(variant).typename()
         if isfuncparam:
             yield CDef(name, f"cdef np.{elementtypename}_t* {name} = &py_{name}[{self.zeros}]")
+            yield from self._iterdims(elementtypename, name, f"py_{name}")
         else:
             yield CDef(name, f"cdef np.{elementtypename}_t* {name}")
 
@@ -172,11 +270,28 @@ class Array:
         pyname = f"py_{cname}"
         yield CDef(pyname, f"cdef np.ndarray[np.{elementtypename}_t{self.ndimtext}] {pyname} = {dotparent}.{name}")
         yield CDef(cname, f"cdef np.{elementtypename}_t* {cname} = &py_{undparent}_{name}[{self.zeros}]")
+        yield from self._iterdims(elementtypename, cname, pyname)
+
+    def _iterdims(self, elementtypename, name, pyname):
+        for k in range(self.ndim): # Strides are in elements, for indexing the flat pointer.
+            yield CDef(f"{name}_shape{k}", f"cdef np.intp_t {name}_shape{k} = {pyname}.shape[{k}]", True)
+            itemsize = f"<np.intp_t> sizeof(np.{elementtypename}_t)" # Signed, as strides may be negative.
+            yield CDef(f"{name}_stride{k}", f"if {pyname}.strides[{k}] % {itemsize}: raise BadArgException({pyname}.strides[{k}])", True) # Otherwise the wrong elements.
+            yield CDef(f"{name}_stride{k}", f"cdef np.intp_t {name}_stride{k} = {pyname}.strides[{k}] // {itemsize}", True)
+
+    def iterdecls(self, variant, name):
+        return ()
+
+    def iterwritebacks(self, name):
+        return ()
 
     def iterplaceholders(self):
         if self.elementtypespec.isplaceholder:
             yield self.elementtypespec, lambda arg: Type(arg.dtype.type)
 
+    def __eq__(self, that):
+        return type(self) == type(that) and (self.elementtypespec, self.ndimtext) == (that.elementtypespec, that.ndimtext)
+
 class Scalar:
 
     def __init__(self, typespec):
@@ -189,6 +304,9 @@ class Scalar:
         typename = self.typespec.resolvedarg(variant).typename()
         return CDef(name, f"np.{typename}_t {name}")
 
+    def ctypename(self, variant):
+        return self.typespec.resolvedarg(variant).ctypename()
+
     def itercdefs(self, variant, name, isfuncparam):
         if not isfuncparam:
             typename = self.typespec.resolvedarg(variant).typename()
@@ -202,10 +320,63 @@ class Scalar:
     def resolvedobj(self, variant):
         return self.typespec.resolvedarg(variant).o
 
+    def iterdecls(self, variant, name):
+        return ()
+
+    def iterwritebacks(self, name):
+        return ()
+
     def iterplaceholders(self):
         if self.typespec.isplaceholder:
             yield self.typespec, lambda arg: Type(type(arg))
 
+    def __eq__(self, that):
+        return type(self) == type(that) and self.typespec == that.typespec
+
+class State: # Scalar kept in a 1-element array, loaded into a local and stored back when the function exits.
+
+    def __init__(self, typespec):
+        self.typespec = typespec
+
+    def ispotentialconst(self):
+        return False
+
+    def cparam(self, variant, name):
+        typename = self.typespec.resolvedarg(variant).typename()
+        name = f"py_{name}"
+        return CDef(name, f"np.ndarray[np.{typename}_t] {name}")
+
+    def _itercdefs(self, typename, name, pyname):
+        yield CDef(f"{name}_state", f"cdef np.{typename}_t* {name}_state = &{pyname}[0]")
+        yield CDef(name, f"cdef np.{typename}_t {name} = {name}_state[0]")
+
+    def itercdefs(self, variant, name, isfuncparam):
+        typename = self.typespec.resolvedarg(variant).typename()
+        if isfuncparam:
+            yield from self._itercdefs(typename, name, f"py_{name}")
+        else:
+            yield CDef(name, f"cdef np.{typename}_t {name}")
+
+    def iternestedcdefs(self, variant, undparent, dotparent, name):
+        typename = self.typespec.resolvedarg(variant).typename()
+        cname = f"{undparent}_{name}"
+        pyname = f"py_{cname}"
+        yield CDef(pyname, f"cdef np.ndarray[np.{typename}_t] {pyname} = {dotparent}.{name}")
+        yield from self._itercdefs(typename, cname, pyname)
+
+    def iterdecls(self, variant, name):
+        return ()
+
+    def iterwritebacks(self, name):
+        yield f"{name}_state[0] = {name}"
+
+    def iterplaceholders(self):
+        if self.typespec.isplaceholder:
+            yield self.typespec, lambda arg: Type(arg.dtype.type)
+
+    def __eq__(self, that):
+        return type(self) == type(that) and self.typespec == that.typespec
+
 class Composite:
 
     def __init__(self, fields):
@@ -219,6 +390,13 @@ class Composite:
             for cdef in fieldtype.iternestedcdefs(variant, name, name, field):
                 yield cdef
 
+    def iterdecls(self, variant, name):
+        return ()
+
+    def iterwritebacks(self, name):
+        for field, fieldtype in self.fields:
+            yield from fieldtype.iterwritebacks(f"{name}_{field}")
+
     def iterplaceholders(self):
         for field, fieldtype in self.fields:
             for placeholder, resolver in fieldtype.iterplaceholders():
@@ -231,6 +409,57 @@ class Composite:
             for cdef in fieldtype.iternestedcdefs(variant, undparent, dotparent, field):
                 yield cdef
 
+    def __eq__(self, that):
+        return type(self) == type(that) and self.fields == that.fields
+
+class RaggedType(Composite): # Rows of variable length as values and offsets, see the Ragged container.
+
+    def __init__(self, elementtypespec, offsettypespec):
+        super().__init__(dict(values = Array(elementtypespec, 1), offsets = Array(offsettypespec, 1), n = Scalar(Type(np.int64))))
+
+class Struct: # 1D array of records, viewed in place as C structs.
+
+    def __init__(self, fields, aligned = False):
+        self.fields = list(fields)
+        self.aligned = aligned
+
+    @classmethod
+    def fromdtype(cls, dtype):
+        return cls([(name, dtype.fields[name][0].type) for name in dtype.names], dtype.isalignedstruct)
+
+    def ispotentialconst(self):
+        return False
+
+    def _cname(self, variant, name):
+        return f"{variant.functionname}_{name}_t"
+
+    def iterdecls(self, variant, name):
+        yield f"cdef {'' if self.aligned else 'packed '}struct {self._cname(variant, name)}:"
+        for field, typespec in self.fields:
+            yield f"    np.{typespec.resolvedarg(variant).typename()}_t {field}"
+
+    def iterwritebacks(self, name):
+        return ()
+
+    def cparam(self, variant, name):
+        pyname = f"py_{name}"
+        return CDef(pyname, f"np.ndarray[{self._cname(variant, name)}] {pyname}")
+
+    def itercdefs(self, variant, name, isfuncparam):
+        cname = self._cname(variant, name)
+        if isfuncparam:
+            yield CDef(name, f"cdef {cname}* {name} = &py_{name}[0]")
+        else:
+            yield CDef(name, f"cdef {cname}* {name}")
+
+    def iterplaceholders(self):
+        for field, typespec in self.fields:
+            if typespec.isplaceholder:
+                yield typespec, lambda arg, field = field: Type(arg.dtype.fields[field][0].type)
+
+    def __eq__(self, that):
+        return type(self) == type(that) and (self.fields, self.aligned) == (that.fields, that.aligned)
+
 class FieldResolver:
 
     def __init__(self, field, resolver):
@@ -251,12 +480,18 @@ class PositionalResolver:
 
 class Variant:
 
-    def __init__(self, decorated, paramtoarg):
+    def __init__(self, decorated, paramtoarg, values = ()):
         self.unbound = set(p for p in decorated.placeholders if p not in paramtoarg)
         if not self.unbound:
-            self.suffix = ''.join(f"_{arg.discriminator()}" for _, arg in sorted(paramtoarg.items()))
-            self.groupsuffix = ''.join(f"_{arg.groupdiscriminator(decorated.groupsets.groups(param))}" for param, arg in sorted(paramtoarg.items()))
+            valuesuffix = ''.join(f"_{name}{str(value).replace('-', 'm')}" for name, value in values)
+            self.suffix = ''.join(f"_{arg.discriminator()}" for _, arg in sorted(paramtoarg.items())) + valuesuffix
+            self.groupsuffix = ''.join(f"_{arg.groupdiscriminator(decorated.groupsets.groups(param))}" for param, arg in sorted(paramtoarg.items())) + valuesuffix
+            self.functionname = f"{decorated.name}{self.suffix}"
         self.paramtoarg = paramtoarg
+        self.values = values # Params folded to constants, as sorted name and value pairs.
+
+    def specialised(self, decorated, values):
+        return type(self)(decorated, self.paramtoarg, tuple(sorted(values.items())))
 
     def spinoff(self, decorated, param, arg):
         if param not in decorated.placeholders:
@@ -280,7 +515,7 @@ class Variant:
             return self.paramtoarg[param].spread(decorated.groupsets.groups(param))
         params = sorted(self.paramtoarg)
         for arglist in product(*(groupargs(param) for param in params)):
-            yield type(self)(decorated, dict(zip(params, arglist)))
+            yield type(self)(decorated, dict(zip(params, arglist)), self.values)
 
 class Decorated:
 
@@ -288,44 +523,56 @@ class Decorated:
 import numpy as np
 
 def make_ext(name, source):
-    return Extension(name, [source], include_dirs = [np.get_include()])
+    return Extension(name, [source], include_dirs = [np.get_include()], extra_compile_args = %(extracompileargs)r, extra_link_args = %(extralinkargs)r)
+
+def make_setup_args():
+    return dict(script_args = %(scriptargs)r)
 '''
     header = '''# cython: language_level=3
 
+from cpython.pycapsule cimport PyCapsule_New
+from pyrbo.common import BadArgException
 cimport numpy as np
 import cython
 '''
     template = """
+# Kernel %(kernel)s.
 @cython.boundscheck(False)
 @cython.cdivision(True) # Don't check for divide-by-zero.
 def %(name)s(%(cparams)s):
 %(code)s"""
+    ctemplate = """
+@cython.boundscheck(False)
+@cython.cdivision(True)
+cdef np.%(returntypename)s_t %(name)s_cfunc(%(cparams)s):
+%(code)s
+
+%(name)s_capsule = PyCapsule_New(<void*>%(name)s_cfunc, b"%(signature)s", NULL)"""
+    codemarker = '%(code)s'
     deftemplate = "DEF %s = %r"
     eol = re.search(r'[\r\n]+', pyxbld).group()
-    indentpattern = re.compile(r'^\s*')
-    colonpattern = re.compile(r':\s*$')
+    consolidatedname = '_consolidated'
+    scorepattern = re.compile(r'<pre class="cython line score-([0-9]+)"[^>]*>[^<]*<span class="">([0-9]+)</span>:')
 
-    @classmethod
-    def _getbody(cls, pyfunc):
-        lines = inspect.getsource(pyfunc).splitlines()
-        getindent = lambda: cls.indentpattern.search(lines[i]).group()
-        i = 0
-        functionindentlen = len(getindent())
-        while True:
-            i += 1 # No point checking (first line of) decorator.
-            if cls.colonpattern.search(lines[i]) is not None:
-                break
-        i += 1
-        bodyindent = getindent()
-        if re.search(r'=\s*LOCAL\s*$', lines[i]) is not None:
-            i += 1
-        return bodyindent[functionindentlen:], ''.join(f"{line[functionindentlen:]}{cls.eol}" for line in lines[i:])
-
-    def __init__(self, nametotypespec, dynamic, groupsets, pyfunc):
+    def __init__(self, nametotypespec, dynamic, groupsets, returntypespec, strict, unroll, isas, consolidate, outputs, maxvariants, policy, adaptive, pyfunc):
         co_varnames = pyfunc.__code__.co_varnames # The params followed by the locals.
         co_argcount = pyfunc.__code__.co_argcount
         self.paramnames = co_varnames[:co_argcount]
-        self.localnames = [n for n in co_varnames[co_argcount:] if 'UNROLL' != n]
+        self.localnames = [n for n in co_varnames[co_argcount:] if n not in {'TILE', 'UNROLL'}]
+        self.fqmodule = pyfunc.__module__
+        self.name = pyfunc.__name__
+        self.pyfunc = pyfunc
+        self._setup(nametotypespec, dynamic, groupsets, returntypespec, strict, unroll, isas, consolidate, outputs, maxvariants, policy, adaptive)
+
+    @cached_property
+    def body(self): # Parsed on first compile, so a binary dist with shared libs bundled needs no source.
+        return parsefunction(self.pyfunc).body
+
+    @cached_property
+    def filename(self):
+        return self.pyfunc.__code__.co_filename
+
+    def _setup(self, nametotypespec, dynamic, groupsets, returntypespec, strict, unroll, isas, consolidate, outputs, maxvariants, policy, adaptive):
         self.constnames = []
         allnames = set(chain(self.paramnames, self.localnames))
         for name, typespec in nametotypespec.items():
@@ -333,15 +580,9 @@ def %(name)s(%(cparams)s):
                 if not typespec.ispotentialconst():
                     raise NoSuchVariableException(name)
                 self.constnames.append(name) # We'll make a DEF for it.
-        self.fqmodule = pyfunc.__module__
-        self.name = pyfunc.__name__
-        try:
-            self.bodyindent, self.body = self._getbody(pyfunc)
-        except OSError:
-            pass # No source, assume binary dist with shared lib bundled.
         # Note placeholders includes those in consts, placeholdertoresolver does not:
         self.placeholders = set()
-        for typespec in nametotypespec.values():
+        for typespec in chain(nametotypespec.values(), [] if returntypespec is None else [returntypespec]):
             for param, _ in typespec.iterplaceholders():
                 self.placeholders.add(param)
         self.placeholdertoresolver = {}
@@ -349,91 +590,502 @@ def %(name)s(%(cparams)s):
             for placeholder, resolver in nametotypespec[name].iterplaceholders():
                 if placeholder not in self.placeholdertoresolver:
                     self.placeholdertoresolver[placeholder] = PositionalResolver(i, resolver)
-        self.suffixtocomplete = {}
+        self.suffixtocomplete = OrderedDict() # Least recently used first.
+        self.suffixtolastuse = {}
+        self.touched = set() # Stems whose marker this process already wrote.
+        self.compilelock = threading.RLock() # One compile at a time per kernel, whichever thread asks.
         self.nametotypespec = nametotypespec
         self.dynamic = dynamic
         self.groupsets = groupsets
+        self.returntypespec = returntypespec
+        self.strict = strict
+        self.unroll = unroll
+        self.isas = list(isas)
+        self.consolidate = consolidate
+        for name in outputs:
+            if name not in self.paramnames:
+                raise NoSuchVariableException(name)
+        self.outputs = outputs
+        self.maxvariants = maxvariants
+        self.policy = policy
+        self.adaptive = adaptive
+
+    def outputshape(self, name, named):
+        spec = self.outputs[name]
+        if callable(spec):
+            return spec(*(named[n] for n in self.paramnames if n in named and n not in self.outputs))
+        arg = named[spec]
+        return arg.shape if isinstance(arg, np.ndarray) else (int(arg),)
+
+    def dispatch(self, variant, args, kwargs):
+        if self.policy is not None:
+            return self.policy(self, variant, args, kwargs)
+        return self.completefor(variant.complete(self, args), args, kwargs)(*args, **kwargs)
+
+    def completefor(self, variant, args, kwargs):
+        complete = self.getcomplete(variant)
+        if self.adaptive is not None:
+            return self.adaptive(self, variant, args, kwargs, complete)
+        return complete
+
+    def hascapsule(self):
+        return self.returntypespec is not None and all(isinstance(self.nametotypespec[name], Scalar) for name in self.paramnames)
 
     def getcomplete(self, variant):
+        if nocompile.preparing():
+            return self._prepare(variant)
         try:
-            return self.suffixtocomplete[variant.suffix]
+            f = self.suffixtocomplete[variant.suffix]
+            if self.maxvariants is not None: # Only a bounded cache needs the recency order.
+                with self.compilelock: # Like _evict, which another thread may be in.
+                    self.suffixtocomplete.move_to_end(variant.suffix)
+                    self.suffixtolastuse[variant.suffix] = time.time()
         except KeyError:
-            self.suffixtocomplete[variant.suffix] = f = self.CompleteInfo(variant).load() # TODO: Do not cache Deferred.
-            return f
+            with self.compilelock:
+                f = self.suffixtocomplete.get(variant.suffix)
+                if f is None: # Not loaded by another thread meanwhile.
+                    f = self._load(variant)
+        return f
+
+    def _load(self, variant):
+        build = self.loadbuild(variant)
+        if self.isas and nocompile.depth():
+            for level in self.isas: # Prepare every level so that the best one can be picked wherever the source ends up.
+                if build is None or level != build.isa:
+                    self.CompleteInfo(variant, Build(self.unroll, isa = level)).load()
+        try:
+            f = self.CompleteInfo(variant, build).load()
+        except ImportError:
+            if build is None or build.isa in {None, isa.names[0]}:
+                raise
+            log.warning("Failed to build %s for %s, falling back to %s.", self.name, build.isa, isa.names[0], exc_info = True) # Probably a compiler that predates the level.
+            f = self.CompleteInfo(variant, Build(build.unroll, build.flags, build.profile, isa = isa.names[0])).load()
+        self.suffixtocomplete[variant.suffix] = f # TODO: Do not cache Deferred.
+        self._touch(f.modulename, True)
+        self.suffixtolastuse[variant.suffix] = time.time()
+        self._evict()
+        return f
+
+    def _touch(self, modulename, once = False): # Last use on disk for prune, in a marker as the binary mtime is compared with the source.
+        stem = modulename.split('.')[-1]
+        if stem == self.consolidatedname or (once and stem in self.touched):
+            return
+        self.touched.add(stem)
+        fileparent = self.fileparent()
+        if not os.access(fileparent, os.W_OK):
+            return # Installed read-only, prune has nothing to delete there anyway.
+        try:
+            (fileparent / f"{stem}.used").touch()
+        except OSError:
+            pass
+
+    def _evict(self): # Bounds the count of loaded variants, CPython never unloads an extension so its memory stays mapped.
+        if self.maxvariants is None:
+            return
+        while len(self.suffixtocomplete) > self.maxvariants:
+            suffix, complete = self.suffixtocomplete.popitem(last = False)
+            self.suffixtolastuse.pop(suffix, None)
+            modulename = complete.modulename
+            self._touch(modulename)
+            if modulename.endswith(f".{self.consolidatedname}") or any(modulename == c.modulename for c in self.suffixtocomplete.values()):
+                continue
+            sys.modules.pop(modulename, None) # Frees the module object once callers drop it, but not the shared object.
+            packagename, stem = modulename.rsplit('.', 1)
+            package = sys.modules.get(packagename)
+            if package is not None and stem in package.__dict__:
+                delattr(package, stem)
+
+    def usage(self):
+        usages = []
+        for suffix, complete in self.suffixtocomplete.items():
+            m = sys.modules.get(complete.modulename)
+            path = getattr(m, '__file__', None)
+            usages.append(Usage(suffix, complete.modulename, 0 if path is None else Path(path).stat().st_size, self.suffixtolastuse.get(suffix)))
+        return usages
+
+    def prune(self, maxage = 0): # Delete group modules of this function that are not loaded and have not been used for maxage seconds.
+        fileparent = self.fileparent()
+        loaded = set(c.modulename.split('.')[-1] for c in self.suffixtocomplete.values())
+        pattern = re.compile(f"^# Kernel {re.escape(self.name)}[.]$", re.MULTILINE) # Exact, not kernels that merely share the prefix.
+        threshold = time.time() - maxage
+        pruned = []
+        for pyxpath in sorted(fileparent.glob('*.pyx')):
+            stem = pyxpath.stem
+            if stem in loaded or stem == self.consolidatedname or pattern.search(pyxpath.read_text()) is None:
+                continue
+            paths = [p for p in fileparent.glob(f"{stem}.*") if p.name.split('.')[0] == stem]
+            if max(p.stat().st_mtime for p in paths) >= threshold:
+                continue
+            for path in paths:
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+            pruned.append(stem)
+        return pruned
+
+    def _prepare(self, variant): # Whatever another machine may load, so not tuned for this one.
+        for level in [None, *self.isas]:
+            f = self.CompleteInfo(variant, None if level is None else Build(self.unroll, isa = level)).load()
+        return f
+
+    def loadbuild(self, variant):
+        build = self.tunedbuild(variant)
+        if build is None and self.isas:
+            level = isa.best(self.isas)
+            if level is not None:
+                build = Build(self.unroll, isa = level)
+        return build
+
+    def fileparent(self):
+        return Path(sys.modules[self.fqmodule].__file__).parent / f"{self.fqmodule.split('.')[-1]}_turbo"
+
+    def _tunedpath(self):
+        return self.fileparent() / 'autotune.json'
+
+    def _loadtuned(self):
+        try:
+            return json.loads(self._tunedpath().read_text())
+        except FileNotFoundError:
+            return {}
+
+    def tunedbuild(self, variant):
+        d = self._loadtuned().get(machine(), {}).get(f"{self.name}{variant.suffix}")
+        return None if d is None else Build.fromdict(d)
+
+    def savetuned(self, variant, build, complete):
+        tuned = self._loadtuned()
+        tuned.setdefault(machine(), {})[f"{self.name}{variant.suffix}"] = build.todict()
+        path = self._tunedpath()
+        path.parent.mkdir(exist_ok = True)
+        path.write_text(json.dumps(tuned, indent = 2, sort_keys = True))
+        with self.compilelock:
+            self.suffixtocomplete[variant.suffix] = complete
 
     @innerclass
     class CompleteInfo:
 
-        def __init__(self, variant):
+        def __init__(self, variant, build = None):
             self.functionname = f"{self.name}{variant.suffix}"
-            self.groupname = f"{self.name}{variant.groupsuffix}"
+            self.groupname = f"{self.name}{variant.groupsuffix}{'' if build is None else build.suffix()}"
             self.fqmodulename = f"{self.fqmodule}_turbo.{self.groupname}"
             self.variant = variant
+            self.build = Build(self.unroll) if build is None else build
+
+        def passes(self):
+            writebacks = [w for name in self.paramnames for w in self.nametotypespec[name].iterwritebacks(name)]
+            return [FoldConsts(), EliminateDeadBranches(), Stencil(), Tile(), Reduce(), Unroll(self.build.unroll), WriteBack(writebacks)]
+
+        def _functionlines(self, variant):
+            cparams = []
+            cdefs = []
+            decls = [Line(d) for name in chain(self.paramnames, self.localnames) if name in self.nametotypespec for d in self.nametotypespec[name].iterdecls(variant, name)]
+            for name in self.paramnames:
+                typespec = self.nametotypespec[name]
+                cparams.append(typespec.cparam(variant, name))
+                cdefs.extend(typespec.itercdefs(variant, name, True))
+            cdefnames = set(cdef.name for cdef in cparams)
+            cdefnames.update(cdef.name for cdef in cdefs)
+            for name in self.localnames:
+                if name not in cdefnames:
+                    typespec = self.nametotypespec[name]
+                    cdefs.extend(typespec.itercdefs(variant, name, False))
+            defs = []
+            consts = dict([name, self.nametotypespec[name].resolvedobj(variant)] for name in self.constnames)
+            for item in consts.items():
+                defs.append(self.deftemplate % item)
+            passes = self.passes()
+            body = transform(self.body, passes, dict(consts, **dict(variant.values)))
+            for p in passes:
+                for name, (likename, size) in p.declared.items(): # Locals introduced by the pass.
+                    for cdef in self.nametotypespec[likename].itercdefs(variant, name, False):
+                        cdefs.append(cdef if size is None else CDef(cdef.name, f"{cdef.text}[{size}]"))
+            used = set(n.id for s in body for n in ast.walk(s) if isinstance(n, ast.Name))
+            cdefs = [cdef for cdef in cdefs if not cdef.optional or cdef.name in used]
+            emitter = Emitter(self.filename)
+            emitter.block(body, 1)
+            code = [Line(f"{emitter.indentunit}{d}") for d in chain(defs, cdefs)] + emitter.lines
+            params = dict(
+                name = f"{self.name}{variant.suffix}",
+                kernel = self.name,
+                cparams = ', '.join(str(p) for p in cparams),
+            )
+            lines = decls + list(self._render(self.template, params, code))
+            if self.hascapsule():
+                lines.extend(self._render(self.ctemplate, dict(params,
+                    returntypename = self.returntypespec.typespec.resolvedarg(variant).typename(),
+                    signature = "%s (%s)" % (self.returntypespec.ctypename(variant), ', '.join(self.nametotypespec[name].ctypename(variant) for name in self.paramnames) or 'void'),
+                ), code))
+            return lines
+
+        def _render(self, template, params, code):
+            for text in (template % dict(params, code = self.codemarker)).splitlines():
+                if self.codemarker == text:
+                    yield from code
+                else:
+                    yield Line(text)
+
+        def functionlines(self):
+            return [l for v in self.variant.groupvariants(self) for l in self._functionlines(v)]
+
+        def lines(self):
+            return [Line(text) for text in self.header.splitlines()] + self.functionlines()
+
+        def text(self):
+            return ''.join(f"{line.text}{self.eol}" for line in self.lines())
 
         def _updatefiles(self):
-            def functiontext(variant):
-                cparams = []
-                cdefs = []
-                for name in self.paramnames:
-                    typespec = self.nametotypespec[name]
-                    cparams.append(typespec.cparam(variant, name))
-                    cdefs.extend(typespec.itercdefs(variant, name, True))
-                cdefnames = set(cdef.name for cdef in cparams)
-                cdefnames.update(cdef.name for cdef in cdefs)
-                for name in self.localnames:
-                    if name not in cdefnames:
-                        typespec = self.nametotypespec[name]
-                        cdefs.extend(typespec.itercdefs(variant, name, False))
-                defs = []
-                consts = dict([name, self.nametotypespec[name].resolvedobj(variant)] for name in self.constnames)
-                for item in consts.items():
-                    defs.append(self.deftemplate % item)
-                body = []
-                unroll(self.body, body, consts, self.eol)
-                body = ''.join(body)
-                return self.template % dict(
-                    name = f"{self.name}{variant.suffix}",
-                    cparams = ', '.join(str(p) for p in cparams),
-                    code = f"""{''.join(f"{self.bodyindent}{d}{self.eol}" for d in chain(defs, cdefs))}{body}""",
-                )
-            text = f"{self.header}{''.join(functiontext(v) for v in self.variant.groupvariants(self))}"
-            fileparent = Path(sys.modules[self.fqmodule].__file__).parent / f"{self.fqmodule.split('.')[-1]}_turbo"
+            fileparent = self.fileparent()
             fileparent.mkdir(exist_ok = True)
             (fileparent / '__init__.py').write_text('')
-            (fileparent / f"{self.groupname}.pyx").write_text(text)
-            (fileparent / f"{self.groupname}.pyxbld").write_text(self.pyxbld)
+            (fileparent / f"{self.groupname}.pyx").write_text(self.text())
+            profiledir = self.profiledir()
+            (fileparent / f"{self.groupname}.pyxbld").write_text(self.pyxbld % dict(
+                extracompileargs = self.build.compileargs() + self.build.profileargs(profiledir),
+                extralinkargs = self.build.linkargs(profiledir),
+                scriptargs = self._scriptargs()))
+
+        def _scriptargs(self):
+            from . import cache # Pulls in subprocess and friends, so only once something is built.
+            builddir = cache.builddir()
+            return [] if builddir is None else ['--build-temp', builddir]
+
+        def _hasbinary(self, stem):
+            fileparent = self.fileparent()
+            return any((fileparent / f"{stem}{suffix}").exists() for suffix in EXTENSION_SUFFIXES)
+
+        def _compile(self, stem, includes = ()):
+            from . import cache
+            fqmodulename = f"{self.fqmodule}_turbo.{stem}"
+            fileparent = self.fileparent()
+            key = cache.key(fqmodulename, *(path.read_text() for path in chain([fileparent / f"{stem}.pyx", fileparent / f"{stem}.pyxbld"], includes)))
+            target = fileparent / f"{stem}{EXTENSION_SUFFIXES[0]}"
+            if cache.fetch(key, target):
+                print('Cached:', stem, file=sys.stderr)
+                return import_module(fqmodulename)
+            print('Compiling:', stem, file=sys.stderr)
+            _installpyximport()
+            with cache.compilerenv():
+                m = import_module(fqmodulename)
+            cache.store(key, target)
+            return m
+
+        def complete(self, f):
+            return (AllocatingComplete if self.outputs else Complete)(f, self)
+
+        def consolidable(self):
+            return self.consolidate and not self.build.compileargs() and self.build.profile is None
+
+        def _loadconsolidated(self):
+            fqmodulename = f"{self.fqmodule}_turbo.{self.consolidatedname}"
+            m = sys.modules.get(fqmodulename)
+            if m is None and not nocompile.preparing():
+                self._removestale(self.consolidatedname)
+                if self._hasbinary(self.consolidatedname):
+                    m = import_module(fqmodulename)
+            if m is not None and hasattr(m, self.functionname) and not nocompile.preparing():
+                self._removegroupfiles()
+                return self.complete(getattr(m, self.functionname))
+            fileparent = self.fileparent()
+            if self.strict:
+                self._updatefiles() # The check annotates the group pyx, removed once the consolidated module has it.
+                self._checkstrict()
+            else:
+                fileparent.mkdir(exist_ok = True)
+                (fileparent / '__init__.py').write_text('')
+            _writeifchanged(fileparent / f"{self.groupname}.pxi", ''.join(f"{line.text}{self.eol}" for line in self.functionlines()))
+            pyxpath = fileparent / f"{self.consolidatedname}.pyx"
+            includes = sorted(fileparent.glob('*.pxi'))
+            _writeifchanged(pyxpath, ''.join(f"{text}{self.eol}" for text in chain(self.header.splitlines(), (f"include {p.name!r}" for p in includes))))
+            _writeifchanged(fileparent / f"{self.consolidatedname}.pyxbld", self.pyxbld % dict(extracompileargs = [], extralinkargs = [], scriptargs = self._scriptargs()))
+            if nocompile.depth():
+                nocompile.prepared(fqmodulename, pyxpath) # Even if loaded, the dist needs the source.
+            if m is not None: # Otherwise already loaded without this variant, which will be in it next time.
+                return self.complete(getattr(m, self.functionname)) if hasattr(m, self.functionname) else None
+            if nocompile.depth():
+                return Deferred(fqmodulename, self.functionname, self)
+            self._removestale(self.consolidatedname)
+            return self.complete(getattr(self._compile(self.consolidatedname, includes), self.functionname))
+
+        def _removegroupfiles(self): # Only the pxi is needed once the consolidated module covers the group.
+            if self.fqmodulename in sys.modules:
+                return # A fallback this process still uses.
+            for path in self.fileparent().glob(f"{self.groupname}.*"):
+                if path.name.split('.')[0] == self.groupname and path.suffix != '.pxi':
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass # Read-only install.
+
+        def _removestale(self, stem):
+            pyxpath = self.fileparent() / f"{stem}.pyx"
+            if pyxpath.exists():
+                for suffix in EXTENSION_SUFFIXES:
+                    path = pyxpath.with_suffix(suffix)
+                    if path.exists() and path.stat().st_mtime < pyxpath.stat().st_mtime:
+                        path.unlink() # The regular importer would load it without checking.
+
+        def profiledir(self):
+            return self.fileparent() / f"{self.groupname}.profile"
+
+        def removebinaries(self):
+            for suffix in EXTENSION_SUFFIXES:
+                path = self.fileparent() / f"{self.groupname}{suffix}"
+                if path.exists():
+                    path.unlink()
+
+        def annotate(self):
+            from Cython.Build import cythonize
+            pyxpath = self.fileparent() / f"{self.groupname}.pyx"
+            if not pyxpath.exists():
+                self._updatefiles()
+            cythonize([str(pyxpath)], annotate = True, force = True, quiet = True, include_path = [np.get_include()])
+            return pyxpath.with_suffix('.html')
+
+        def pythonlines(self):
+            htmlpath = self.annotate()
+            lines = htmlpath.with_suffix('.pyx').read_text().splitlines()
+            return [PythonLine(int(m.group(2)), int(m.group(1)), lines[int(m.group(2)) - 1])
+                    for m in self.scorepattern.finditer(htmlpath.read_text()) if int(m.group(1))]
+
+        def _checkstrict(self):
+            pyxpath = self.fileparent() / f"{self.groupname}.pyx"
+            lines = self.lines()
+            for pythonline in self.pythonlines():
+                line = lines[pythonline.lineno - 1]
+                if line.inloop:
+                    pyxpath.unlink() # Otherwise a later import would build it.
+                    raise PythonInLoopException(self.name, line.location or f"{pyxpath}:{pythonline.lineno}", line.text.strip())
 
         def load(self):
+            if self.consolidable():
+                complete = self._loadconsolidated()
+                if complete is not None:
+                    return complete
             try:
-                # FIXME: This may compile stale source!
+                if nocompile.preparing() or not self._hasbinary(self.groupname):
+                    raise ImportError # Let _compile consult the cache rather than pyximport build the pyx.
+                # FIXME: This may load a stale binary!
                 m = import_module(self.fqmodulename)
             except ImportError:
                 self._updatefiles()
-                compileenabled = not nocompile.depth()
-                print('Compiling:' if compileenabled else 'Prepared:', self.groupname, file=sys.stderr)
-                if not compileenabled:
-                    return Deferred(self.fqmodulename, self.functionname)
-                m = import_module(self.fqmodulename)
-            return Complete(getattr(m, self.functionname))
+                if self.strict:
+                    self._checkstrict()
+                if nocompile.depth():
+                    nocompile.prepared(self.fqmodulename, self.fileparent() / f"{self.groupname}.pyx")
+                    return Deferred(self.fqmodulename, self.functionname, self)
+                m = self._compile(self.groupname)
+            return self.complete(getattr(m, self.functionname))
 
     def __repr__(self):
         return f"{type(self).__name__}(<function {self.name}>)"
 
+def _installpyximport(): # Only when something needs building, so precompiled kernels never load the toolchain.
+    import initnative
+    del initnative
+
+def _writeifchanged(path, text): # Keep the mtime so that pyximport does not rebuild.
+    try:
+        if path.read_text() == text:
+            return
+    except FileNotFoundError:
+        pass
+    path.write_text(text)
+
+class Usage:
+
+    def __init__(self, suffix, modulename, size, lastuse):
+        self.suffix = suffix
+        self.modulename = modulename
+        self.size = size
+        self.lastuse = lastuse
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.suffix!r}, {self.modulename!r}, {self.size!r}, {self.lastuse!r})"
+
+class PythonLine:
+
+    def __init__(self, lineno, score, text):
+        self.lineno = lineno
+        self.score = score
+        self.text = text
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.lineno!r}, {self.score!r}, {self.text!r})"
+
 class BaseComplete:
 
     def __call__(self, *args, **kwargs):
+        if kwargs and self.info is not None: # Positionally, as array params are renamed in the generated def.
+            args = list(args)
+            for name in self.info.paramnames[len(args):]:
+                if name not in kwargs:
+                    break
+                args.append(kwargs.pop(name))
         return self.f(*args, **kwargs)
 
     def __get__(self, instance, owner):
-        return lambda *args, **kwargs: self.f(instance, *args, **kwargs)
+        return lambda *args, **kwargs: self(instance, *args, **kwargs)
+
+    @property
+    def capsule(self):
+        return getattr(import_module(self.f.__module__), f"{self.f.__name__}_capsule")
+
+    @property
+    def lowlevelcallable(self):
+        from scipy import LowLevelCallable
+        return LowLevelCallable(self.capsule)
+
+    @property
+    def isa(self):
+        return self.info.build.isa
+
+    def source(self):
+        return self.info.text()
+
+    def annotate(self):
+        return self.info.annotate()
+
+    def pythonlines(self):
+        return self.info.pythonlines()
 
     def __repr__(self):
         return f"{type(self).__name__}({self.f!r})"
 
 class Complete(BaseComplete):
 
-    def __init__(self, f):
+    def __init__(self, f, info = None):
         self.f = f
+        self.info = info
+
+    @property
+    def modulename(self):
+        return self.f.__module__
+
+class AllocatingComplete(Complete):
+
+    def __call__(self, *args, **kwargs):
+        info = self.info
+        if not kwargs and len(args) >= len(info.paramnames):
+            return self.f(*args)
+        named = dict(zip(info.paramnames, args), **kwargs)
+        args = list(args)
+        outputs = []
+        for name in info.paramnames[len(args):]: # Positionally, as array params are renamed in the generated def.
+            if name in kwargs:
+                args.append(kwargs.pop(name))
+                continue
+            if name not in info.outputs:
+                break # Let the function complain.
+            array = pool.pool().acquire(info.outputshape(name, named), info.nametotypespec[name].elementtypespec.resolvedarg(info.variant).unwrap())
+            args.append(array)
+            outputs.append(array)
+        value = self.f(*args, **kwargs)
+        if not outputs: # All supplied by the caller.
+            return value
+        if value is not None:
+            outputs.insert(0, value)
+        return outputs[0] if 1 == len(outputs) else tuple(outputs)
 
 class Deferred(BaseComplete):
 
@@ -441,12 +1093,14 @@ class Deferred(BaseComplete):
     def f(self):
         return self._getf()
 
-    def __init__(self, modulename, functionname):
+    def __init__(self, modulename, functionname, info = None):
         self.modulename = modulename
         self.functionname = functionname
+        self.info = info
 
     def _getf(self):
         assert self.modulename in sys.modules or not nocompile.depth()
+        _installpyximport() # The prepared pyx may not have been built yet.
         f = getattr(import_module(self.modulename), self.functionname)
         self._getf = lambda: f
         return f
@@ -481,7 +1135,7 @@ class Partial:
         return partialorcomplete(self.decorated, self.variant.spinoff(self.decorated, param, arg))
 
     def __call__(self, *args, **kwargs):
-        return self.decorated.getcomplete(self.variant.complete(self.decorated, args))(*args, **kwargs)
+        return self.decorated.dispatch(self.variant, args, kwargs)
 
     def __get__(self, instance, owner):
         return InstancePartial(instance, self.decorated, self.variant)
@@ -489,6 +1143,11 @@ class Partial:
     def __repr__(self):
         return f"{type(self).__name__}({self.decorated!r})"
 
+def resolve(kernel, args = None): # Decorated and variant of a bound kernel, completed from args if it is a partial.
+    if isinstance(kernel, Partial):
+        return kernel.decorated, kernel.variant if args is None else kernel.variant.complete(kernel.decorated, args)
+    return kernel.info, kernel.info.variant # The info proxies its decorated.
+
 class InstancePartial:
 
     def __init__(self, instance, decorated, variant):
@@ -497,7 +1156,7 @@ class InstancePartial:
         self.variant = variant
 
     def __call__(self, *args, **kwargs):
-        return self.decorated.getcomplete(self.variant.complete(self.decorated, (self.instance,) + args))(self.instance, *args, **kwargs)
+        return self.decorated.dispatch(self.variant, (self.instance,) + args, kwargs)
 
     def __getitem__(self, paramandarg):
         param, arg = paramandarg
@@ -508,13 +1167,16 @@ class InstancePartial:
         else:
             return InstanceComplete(self.instance, self.decorated.getcomplete(variant))
 
+def wrap(spec):
+    return spec if isinstance(spec, Placeholder) else Type(spec)
+
 class Decorator:
 
-    def __init__(self, nametotypespec, dynamic, groupsets):
-        def wrap(spec):
-            return spec if isinstance(spec, Placeholder) else Type(spec)
+    def __init__(self, nametotypespec, dynamic, groupsets, returns, strict, unroll, isas, consolidate, outputs, maxvariants, policy, adaptive):
         def iternametotypespec(nametotypespec):
             for name, typespec in nametotypespec.items():
+                if isinstance(typespec, np.dtype) and typespec.names:
+                    typespec = Struct.fromdtype(typespec)
                 if list == type(typespec):
                     elementtypespec, = typespec
                     ndim = 1
@@ -524,13 +1186,28 @@ class Decorator:
                     typespec = Array(wrap(elementtypespec), ndim)
                 elif dict == type(typespec):
                     typespec = Composite(dict(iternametotypespec(typespec)))
+                elif isinstance(typespec, RaggedType):
+                    pass
+                elif isinstance(typespec, Struct):
+                    typespec = Struct([(field, wrap(t)) for field, t in typespec.fields], typespec.aligned)
+                elif isinstance(typespec, State):
+                    typespec = State(wrap(typespec.typespec))
                 else:
                     typespec = Scalar(wrap(typespec))
                 yield name, typespec
         self.nametotypespec = dict(iternametotypespec(nametotypespec))
         self.dynamic = dynamic
         self.groupsets = GroupSets(groupsets)
+        self.returntypespec = None if returns is None else Scalar(wrap(returns))
+        self.strict = strict
+        self.unroll = unroll
+        self.isas = isas
+        self.consolidate = consolidate
+        self.outputs = outputs
+        self.maxvariants = maxvariants
+        self.policy = policy
+        self.adaptive = adaptive
 
     def __call__(self, pyfunc):
-        decorated = Decorated(self.nametotypespec, self.dynamic, self.groupsets, pyfunc)
+        decorated = Decorated(self.nametotypespec, self.dynamic, self.groupsets, self.returntypespec, self.strict, self.unroll, self.isas, self.consolidate, self.outputs, self.maxvariants, self.policy, self.adaptive, pyfunc)
         return partialorcomplete(decorated, Variant(decorated, {}))
@@ -0,0 +1,77 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NoProfileException, NoTrainingException, UnsupportedCompilerException
+from .model import Build, resolve
+from .unroll import isgcc
+from copy import deepcopy
+from hashlib import md5
+from tempfile import TemporaryDirectory
+import os, pickle, shutil, sys
+
+replayscript = '''import initnative, pickle, pyrbo, sys # Builds the instrumented module.
+from importlib import import_module
+f = getattr(import_module(sys.argv[1]), sys.argv[2])
+with open(sys.argv[3], 'rb') as g:
+    for args in pickle.load(g):
+        f(*args)
+'''
+
+def record(train):
+    if not callable(train):
+        return [tuple(args) for args in train]
+    calls = []
+    train(lambda *args: calls.append(deepcopy(args)))
+    return calls
+
+def _replay(info, calls):
+    import subprocess # Only needed to train, not to import pyrbo.
+    with TemporaryDirectory() as tempdir:
+        callspath = os.path.join(tempdir, 'calls.pickle')
+        with open(callspath, 'wb') as f:
+            pickle.dump(calls, f)
+        # A fresh process so that the counters are dumped at exit and the module can then be rebuilt under the same name:
+        subprocess.check_call([sys.executable, '-c', replayscript, info.fqmodulename, info.functionname, callspath],
+                env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)))
+
+def pgo(kernel, train):
+    if not isgcc(): # The profile flags and gcda format are GCC's.
+        from . import cache
+        raise UnsupportedCompilerException(cache.compiler())
+    calls = record(train)
+    decorated, variant = resolve(kernel, calls[0] if calls else None)
+    if not calls: # Nothing to profile, and a partial can't be resolved.
+        raise NoTrainingException(decorated.name)
+    base = decorated.loadbuild(variant)
+    if base is None:
+        base = Build(decorated.unroll)
+    profile = md5(pickle.dumps(calls)).hexdigest()[:8]
+    info = decorated.CompleteInfo(variant, Build(base.unroll, base.flags, profile, True, base.isa))
+    shutil.rmtree(info.profiledir(), ignore_errors = True)
+    info.removebinaries()
+    info._updatefiles()
+    print('Training:', info.groupname, file = sys.stderr)
+    _replay(info, calls)
+    if not any(info.profiledir().rglob('*.gcda')): # Otherwise the use build would quietly be a plain one.
+        raise NoProfileException(info.groupname)
+    info.removebinaries()
+    build = info.build.trained()
+    info = decorated.CompleteInfo(variant, build)
+    info._updatefiles() # Otherwise the import would rebuild from the instrumented pyxbld.
+    complete = info.load()
+    decorated.savetuned(variant, build, complete)
+    return complete
@@ -0,0 +1,118 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import CompileBudgetException, NoCastException, NotDynamicException
+from .model import Array, Type
+from . import pool
+import ast, numpy as np, weakref
+
+def _written(decorated): # Array params the kernel may store to, the others are never copied back.
+    written = set(decorated.outputs)
+    try:
+        body = decorated.body
+    except OSError:
+        body = [] # No source, so only declared outputs are known.
+    for statement in body:
+        for node in ast.walk(statement):
+            if isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Store) and isinstance(node.value, ast.Name):
+                written.add(node.value.id)
+    return written
+
+class Policy: # Dispatch for dynamic kernels, casting args to allowed or already compiled variants.
+
+    def __init__(self, allowed = None, budget = None, casting = 'same_kind'):
+        self.allowed = {} if allowed is None else {p: [np.dtype(t).type for t in types] for p, types in allowed.items()}
+        self.budget = budget
+        self.casting = casting
+        self.compiles = 0
+        self.casts = 0
+        self.refusals = 0
+        self.written = weakref.WeakKeyDictionary() # Not by id, which may be reused once a kernel is collected.
+
+    def _nearest(self, name, t, candidates):
+        for casting in 'safe', self.casting: # Prefer a variant that loses nothing.
+            fits = [c for c in candidates if np.can_cast(t, c, casting)]
+            if fits:
+                return min(fits, key = lambda c: np.dtype(c).itemsize)
+        raise NoCastException(name, t)
+
+    def _fits(self, arg, compiled): # Only lossless fallbacks, and only if the policy's casting allows them.
+        if arg.discriminator() == compiled.discriminator():
+            return True
+        return (isinstance(arg, Type) and isinstance(compiled, Type) and np.can_cast(arg.unwrap(), compiled.unwrap(), 'safe')
+                and np.can_cast(arg.unwrap(), compiled.unwrap(), self.casting))
+
+    def variant(self, decorated, variant, args):
+        if not decorated.dynamic:
+            raise NotDynamicException(decorated.name)
+        paramtoarg = variant.paramtoarg.copy()
+        for param in variant.unbound:
+            arg = decorated.placeholdertoresolver[param](args)
+            allowed = self.allowed.get(param)
+            if allowed is not None and arg.unwrap() not in allowed:
+                arg = Type(self._nearest(decorated.name, arg.unwrap(), allowed))
+            paramtoarg[param] = arg
+        candidate = type(variant)(decorated, paramtoarg)
+        if candidate.suffix in decorated.suffixtocomplete:
+            return candidate
+        if self.budget is None or self.compiles < self.budget:
+            self.compiles += 1
+            return candidate
+        for c in decorated.suffixtocomplete.values(): # Over budget, so make do with what we have.
+            if c.info is not None and all(self._fits(paramtoarg[p], c.info.variant.paramtoarg[p]) for p in paramtoarg):
+                return c.info.variant
+        self.refusals += 1
+        raise CompileBudgetException(decorated.name, candidate.suffix)
+
+    def __call__(self, decorated, variant, args, kwargs):
+        variant = self.variant(decorated, variant, args)
+        args = list(args)
+        kwargs = dict(kwargs)
+        try:
+            written = self.written[decorated]
+        except KeyError:
+            written = self.written[decorated] = _written(decorated)
+        named = [(name, args, i) for i, name in enumerate(decorated.paramnames[:len(args)])]
+        named.extend((name, kwargs, name) for name in decorated.paramnames[len(args):] if name in kwargs)
+        pending = []
+        for name, container, k in named:
+            arg = container[k]
+            typespec = decorated.nametotypespec[name]
+            if not (isinstance(typespec, Array) and isinstance(arg, np.ndarray)):
+                continue
+            t = typespec.elementtypespec.resolvedarg(variant).unwrap()
+            if arg.dtype.type != t:
+                if name in written and not np.can_cast(t, arg.dtype, self.casting): # Refuse now, the copy back must not fail after the call.
+                    raise NoCastException(name, t)
+                pending.append((name, container, k, arg, t))
+        complete = decorated.completefor(variant, args, kwargs)
+        casts = []
+        for name, container, k, arg, t in pending:
+            container[k] = cast = pool.pool().acquire(arg.shape, t) # Reused across calls, so no allocation in steady state.
+            np.copyto(cast, arg, casting = self.casting)
+            casts.append((name, arg, cast))
+            self.casts += 1
+        try:
+            return complete(*args, **kwargs)
+        finally:
+            for name, arg, cast in casts:
+                if name in written:
+                    np.copyto(arg, cast, casting = self.casting)
+                pool.release(cast)
+
+    def stats(self):
+        return dict(compiles = self.compiles, casts = self.casts, refusals = self.refusals)
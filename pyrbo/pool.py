@@ -0,0 +1,97 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from contextlib import contextmanager
+import numpy as np, threading
+
+threadstate = threading.local()
+
+class Lease: # Base of every view handed out, so the buffer goes back to the pool once the last view is dropped.
+
+    def __init__(self, pool, key, buffer, view):
+        self.pool = pool
+        self.key = key
+        self.buffer = buffer
+        self.__array_interface__ = view.__array_interface__
+
+    def __del__(self):
+        self.pool._recycle(self)
+
+class Pool:
+
+    def __init__(self):
+        self.free = {}
+        self.outstanding = set()
+        self.scopes = []
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, shape, dtype):
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape, dtype = np.int64))
+        key = dtype, 1 << max(0, size - 1).bit_length() # Round up to a power of two.
+        buffers = self.free.get(key)
+        if buffers:
+            self.hits += 1
+            buffer = buffers.pop()
+        else:
+            self.misses += 1
+            buffer = np.empty(key[1], dtype = dtype)
+        lease = Lease(self, key, buffer, buffer[:size].reshape(shape))
+        self.outstanding.add(id(lease))
+        array = np.asarray(lease)
+        if self.scopes:
+            self.scopes[-1].append(array)
+        return array
+
+    def _recycle(self, lease):
+        if id(lease) in self.outstanding:
+            self.outstanding.remove(id(lease))
+            self.free.setdefault(lease.key, []).append(lease.buffer)
+
+    def release(self, array): # Caller promises not to touch the array again.
+        self._recycle(array.base)
+
+    @contextmanager
+    def scope(self): # Release everything acquired within.
+        self.scopes.append([])
+        try:
+            yield self
+        finally:
+            for array in self.scopes.pop():
+                self.release(array)
+
+    def stats(self):
+        return dict(hits = self.hits, misses = self.misses, outstanding = len(self.outstanding), pooled = sum(map(len, self.free.values())))
+
+def pool():
+    try:
+        return threadstate.pool
+    except AttributeError:
+        threadstate.pool = p = Pool()
+        return p
+
+def release(*arrays):
+    p = pool()
+    for array in arrays:
+        p.release(array)
+
+def scope():
+    return pool().scope()
+
+def stats():
+    return pool().stats()
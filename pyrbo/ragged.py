@@ -0,0 +1,50 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .model import RaggedType, wrap
+import numpy as np
+
+class Ragged:
+
+    def __class_getitem__(cls, types):
+        elementtype, offsettype = types if tuple == type(types) else (types, np.int64)
+        return RaggedType(wrap(elementtype), wrap(offsettype))
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+        self.n = len(offsets) - 1
+
+    @classmethod
+    def fromlists(cls, rows, dtype = None):
+        offsets = np.zeros(len(rows) + 1, dtype = np.int64)
+        np.cumsum([len(row) for row in rows], out = offsets[1:])
+        values = np.concatenate([np.asarray(row, dtype = dtype) for row in rows]) if rows else np.empty(0, dtype = dtype)
+        return cls(values, offsets)
+
+    @classmethod
+    def frombuffers(cls, values, offsets, dtype, offsettype = np.int64): # Arrow list layout, offsets need not start at 0, pass int32 for a plain list.
+        def view(buffer, dtype):
+            a = np.frombuffer(buffer, dtype = dtype)
+            return a if a.flags.writeable else a.copy() # Kernels take writable buffers.
+        return cls(view(values, dtype), view(offsets, offsettype))
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
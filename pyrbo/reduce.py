@@ -0,0 +1,191 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NotReducibleException
+from .frontend import Pass
+from copy import deepcopy
+import ast
+
+lanes = 4
+blocksize = 0x80
+maxlevels = 64
+binops = {ast.Add: '+', ast.Mult: '*', ast.BitAnd: '&', ast.BitOr: '|', ast.BitXor: '^'}
+identities = {ast.Add: 0, ast.Mult: 1, ast.BitXor: 0} # Other ops are idempotent, so lanes can start from the accumulator.
+idempotents = {'min', 'max'} # Safe to start every lane from the accumulator, other calls need an explicit identity.
+cmpops = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>='}
+
+class Shift(ast.NodeTransformer):
+
+    def __init__(self, name, k):
+        self.name = name
+        self.k = k
+
+    def visit_Name(self, node):
+        if self.name == node.id and self.k:
+            return ast.BinOp(node, ast.Add(), ast.Constant(self.k))
+        return node
+
+def _names(node):
+    return set(n.id for n in ast.walk(node) if isinstance(n, ast.Name))
+
+def _tree(exprs, combine):
+    while len(exprs) > 1:
+        exprs = [combine(*exprs[i:i + 2]) if i + 1 < len(exprs) else exprs[i] for i in range(0, len(exprs), 2)]
+    return exprs[0]
+
+class Reduce(Pass):
+
+    def __init__(self):
+        self.declared = {}
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        if not (isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Name) and 'REDUCE' == node.iter.func.id):
+            return node
+        text = ast.unparse(node).splitlines()[0]
+        if not (isinstance(node.target, ast.Name) and 1 == len(node.iter.args) and not node.orelse and 1 == len(node.body)):
+            raise NotReducibleException(text, 'Expected a single statement body and no else.')
+        keywords = {k.arg: k.value for k in node.iter.keywords}
+        self.i = node.target.id
+        self.n = ast.unparse(node.iter.args[0])
+        self.k = getattr(keywords['lanes'], 'value', None) if 'lanes' in keywords else lanes
+        if not (isinstance(self.k, int) and 0 < self.k and not blocksize % self.k): # Blocks must hold whole strides.
+            raise NotReducibleException(text, f"Lanes must be a positive constant dividing {blocksize}.")
+        statement, = node.body
+        lines = self._argreduce(statement) if isinstance(statement, ast.If) else self._reduce(statement, keywords.get('identity'))
+        if lines is None:
+            raise NotReducibleException(text, 'Expected acc op= expr or acc = f(acc, expr) with an identity unless f is min or max, and the op must be associative and commutative as lanes and blocks reorder it.')
+        return [ast.fix_missing_locations(ast.copy_location(s, node)) for s in ast.parse('\n'.join(lines)).body]
+
+    def _declare(self, name, likename, size = None):
+        self.declared[name] = likename, size
+        return name
+
+    def _at(self, expr, k):
+        return f"({ast.unparse(Shift(self.i, k).visit(deepcopy(expr)))})"
+
+    def _reduce(self, statement, identity):
+        if isinstance(statement, ast.AugAssign) and isinstance(statement.target, ast.Name) and type(statement.op) in binops:
+            acc = statement.target.id
+            expr = statement.value
+            combine = lambda a, b: f"({a} {binops[type(statement.op)]} {b})"
+            if identity is None:
+                identity = identities.get(type(statement.op))
+            pairwise = isinstance(statement.op, ast.Add)
+        elif (isinstance(statement, ast.Assign) and 1 == len(statement.targets) and isinstance(statement.targets[0], ast.Name)
+                and isinstance(statement.value, ast.Call) and 2 == len(statement.value.args) and not statement.value.keywords):
+            acc = statement.targets[0].id
+            f = ast.unparse(statement.value.func)
+            exprs = [a for a in statement.value.args if not (isinstance(a, ast.Name) and acc == a.id)]
+            if 1 != len(exprs) or (identity is None and f not in idempotents):
+                return
+            expr, = exprs
+            combine = lambda a, b: f"{f}({a}, {b})"
+            pairwise = False
+        else:
+            return
+        if acc in _names(expr):
+            return
+        init = acc if identity is None else ast.unparse(identity) if isinstance(identity, ast.AST) else repr(identity)
+        i, n, k = self.i, self.n, self.k
+        lane = [self._declare(f"{acc}_lane{j}", acc) for j in range(k)]
+        lines = [f"{i} = 0"]
+        if pairwise: # Blocks combined like a binary counter, so error grows with the log of the length.
+            levels = self._declare(f"{acc}_levels", acc, maxlevels)
+            top, count, carry, end = (self._declare(f"{acc}_{name}", i) for name in ['top', 'count', 'carry', 'end'])
+            lines += [
+                f"{top} = 0",
+                f"{count} = 0",
+                f"while {i} + {blocksize} <= {n}:",
+                *(f"    {l} = {init}" for l in lane),
+                f"    {end} = {i} + {blocksize}",
+                f"    while {i} < {end}:",
+                *(f"        {lane[j]} = {combine(lane[j], self._at(expr, j))}" for j in range(k)),
+                f"        {i} += {k}",
+                f"    {lane[0]} = {_tree(lane, combine)}",
+                f"    {count} += 1",
+                f"    {carry} = {count}",
+                f"    while not ({carry} & 1):",
+                f"        {top} -= 1",
+                f"        {lane[0]} = {levels}[{top}] + {lane[0]}",
+                f"        {carry} >>= 1",
+                f"    {levels}[{top}] = {lane[0]}",
+                f"    {top} += 1",
+            ]
+        lines += [
+            *(f"{l} = {init}" for l in lane),
+            f"while {i} + {k} <= {n}:",
+            *(f"    {lane[j]} = {combine(lane[j], self._at(expr, j))}" for j in range(k)),
+            f"    {i} += {k}",
+            f"while {i} < {n}:",
+            f"    {lane[0]} = {combine(lane[0], self._at(expr, 0))}",
+            f"    {i} += 1",
+            f"{lane[0]} = {_tree(lane, combine)}",
+        ]
+        if pairwise:
+            lines += [
+                f"while {top}:",
+                f"    {top} -= 1",
+                f"    {lane[0]} = {lane[0]} + {levels}[{top}]",
+            ]
+        lines.append(f"{acc} = {combine(acc, lane[0])}")
+        return lines
+
+    def _argreduce(self, statement):
+        test = statement.test
+        if not (isinstance(test, ast.Compare) and 1 == len(test.ops) and type(test.ops[0]) in cmpops
+                and isinstance(test.comparators[0], ast.Name) and not statement.orelse and 2 == len(statement.body)
+                and all(isinstance(s, ast.Assign) and 1 == len(s.targets) and isinstance(s.targets[0], ast.Name) for s in statement.body)):
+            return
+        best = test.comparators[0].id
+        expr = test.left
+        assigns = {s.targets[0].id: s.value for s in statement.body}
+        if best not in assigns or ast.dump(assigns.pop(best)) != ast.dump(expr) or best in _names(expr):
+            return
+        (index, value), = assigns.items()
+        if not (isinstance(value, ast.Name) and self.i == value.id):
+            return
+        cmp = cmpops[type(test.ops[0])]
+        tie = '<' if cmp in {'<', '>'} else '>' # Strict keeps the first occurrence, otherwise the last.
+        i, n, k = self.i, self.n, self.k
+        values = [self._declare(f"{best}_lane{j}", best) for j in range(k)]
+        indices = [self._declare(f"{index}_lane{j}", index) for j in range(k)]
+        lines = [f"{i} = 0"]
+        lines += (f"{v} = {best}" for v in values)
+        lines += (f"{x} = {index}" for x in indices)
+        lines.append(f"while {i} + {k} <= {n}:")
+        for j in range(k):
+            lines += [
+                f"    if {self._at(expr, j)} {cmp} {values[j]}:",
+                f"        {values[j]} = {self._at(expr, j)}",
+                f"        {indices[j]} = {i} + {j}",
+            ]
+        lines += [
+            f"    {i} += {k}",
+            f"while {i} < {n}:",
+            f"    if {self._at(expr, 0)} {cmp} {values[0]}:",
+            f"        {values[0]} = {self._at(expr, 0)}",
+            f"        {indices[0]} = {i}",
+            f"    {i} += 1",
+        ]
+        for v, x in zip(values, indices):
+            lines += [
+                f"if {v} {cmp[0]} {best} or ({v} == {best} and {x} {tie} {index}):",
+                f"    {best} = {v}",
+                f"    {index} = {x}",
+            ]
+        return lines
@@ -0,0 +1,82 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import isa
+from .model import Build, machine, resolve
+from .unroll import CompilerUnroll
+from bisect import bisect_right
+import json, numpy as np, sys
+
+sizes = [1 << k for k in range(0, 21, 4)]
+
+def candidates(decorated):
+    return [Build(decorated.unroll), Build(CompilerUnroll(8), ['-O3']), Build(decorated.unroll, ['-O3'], isa = isa.best(decorated.isas))]
+
+class Sized:
+
+    def __init__(self, name, index, starts, completes):
+        self.name = name
+        self.index = index
+        self.starts = starts
+        self.completes = completes
+
+    def __call__(self, *args, **kwargs):
+        n = args[self.index] if self.index < len(args) else kwargs[self.name]
+        return self.completes[bisect_right(self.starts, len(n) if isinstance(n, np.ndarray) else n) - 1](*args, **kwargs)
+
+def _path(decorated):
+    return decorated.fileparent() / 'sized.json'
+
+def _load(decorated):
+    try:
+        return json.loads(_path(decorated).read_text())
+    except FileNotFoundError:
+        return {}
+
+def _calibrate(builds, completes, makeargs, sizes, timer):
+    segments = []
+    for size in sizes:
+        args = makeargs(size)
+        medians = [timer(lambda: complete(*args)).median() for complete in completes]
+        best = min(range(len(builds)), key = medians.__getitem__)
+        print('Timed:', size, builds[best], f"{medians[best]:.0f} ns", file = sys.stderr)
+        if not segments or best != segments[-1][1]:
+            segments.append([0 if not segments else size, best])
+    return segments
+
+def sized(kernel, makeargs, size, builds = candidates, sizes = sizes, timer = None):
+    decorated, variant = resolve(kernel, makeargs(sizes[0]))
+    if callable(builds):
+        builds = builds(decorated)
+    completes = [decorated.CompleteInfo(variant, build).load() for build in builds]
+    key = f"{decorated.name}{variant.suffix}"
+    calibrations = _load(decorated)
+    calibration = calibrations.get(machine(), {}).get(key)
+    if calibration is None or calibration['builds'] != [repr(b) for b in builds] or calibration.get('sizes') != list(sizes):
+        if timer is None:
+            from .bench import Timer
+            timer = Timer(3, 11)
+        calibration = dict(builds = [repr(b) for b in builds], sizes = list(sizes), segments = _calibrate(builds, completes, makeargs, sizes, timer))
+        calibrations.setdefault(machine(), {})[key] = calibration
+        path = _path(decorated)
+        try:
+            path.parent.mkdir(exist_ok = True)
+            path.write_text(json.dumps(calibrations, indent = 2, sort_keys = True))
+        except OSError: # Read-only install, so calibrate again next time.
+            print('Not saved:', path, file = sys.stderr)
+    segments = calibration['segments']
+    return Sized(size, decorated.paramnames.index(size), [start for start, _ in segments], [completes[i] for _, i in segments])
@@ -0,0 +1,123 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NotStencilException
+from .frontend import Pass
+from copy import deepcopy
+import ast
+
+boundaries = {'constant', 'reflect', 'wrap'}
+
+def _expr(text):
+    return ast.parse(text, mode = 'eval').body
+
+class Offsets:
+
+    def __init__(self, i):
+        self.i = i
+
+    def isoffset(self, node):
+        if not (isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub))):
+            return False
+        if isinstance(node.left, ast.Name) and self.i == node.left.id:
+            return True
+        return isinstance(node.op, ast.Add) and isinstance(node.right, ast.Name) and self.i == node.right.id
+
+    def find(self, node):
+        return [n for n in ast.walk(node) if self.isoffset(n)]
+
+class Remap(ast.NodeTransformer):
+
+    def __init__(self, offsets, n, boundary):
+        self.offsets = offsets
+        self.n = n
+        self.boundary = boundary
+        self.inslice = False
+
+    def visit_Subscript(self, node):
+        node.value = self.visit(node.value)
+        inslice, self.inslice = self.inslice, True # Only indices are remapped, the same expression as a value is left alone.
+        try:
+            node.slice = self.visit(node.slice)
+        finally:
+            self.inslice = inslice
+        return node
+
+    def visit_BinOp(self, node):
+        if not (self.inslice and self.offsets.isoffset(node)):
+            return self.generic_visit(node)
+        j, n = f"({ast.unparse(node)})", self.n
+        if 'wrap' == self.boundary: # C remainder takes the sign of the dividend, so fold twice.
+            return _expr(f"({j} % {n} + {n}) % {n}")
+        m = f"(({j} % (2 * {n}) + 2 * {n}) % (2 * {n}))" # Position in the mirrored period, any radius.
+        return _expr(f"({m} if {m} < {n} else 2 * {n} - 1 - {m})")
+
+class Mask(ast.NodeTransformer):
+
+    def __init__(self, offsets, n, cval):
+        self.offsets = offsets
+        self.n = n
+        self.cval = cval
+
+    def visit_Subscript(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+        found = self.offsets.find(node.slice)
+        if not found:
+            return node
+        test = ' and '.join(f"0 <= {ast.unparse(j)} < {self.n}" for j in found)
+        return ast.IfExp(_expr(test), node, deepcopy(self.cval))
+
+class Stencil(Pass):
+
+    def __init__(self):
+        self.declared = {}
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        if not (isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Name) and 'STENCIL' == node.iter.func.id):
+            return node
+        text = ast.unparse(node).splitlines()[0]
+        if not (isinstance(node.target, ast.Name) and 2 == len(node.iter.args) and not node.orelse):
+            raise NotStencilException(text)
+        keywords = {k.arg: k.value for k in node.iter.keywords}
+        boundary = getattr(keywords.get('boundary'), 'value', 'constant')
+        if boundary not in boundaries or not keywords.keys() <= {'boundary', 'cval'}:
+            raise NotStencilException(text)
+        i = node.target.id
+        n = f"{i}_n" # Typed like the index, so the split points don't wrap if n is unsigned.
+        self.declared[n] = i, None
+        r = f"({ast.unparse(node.iter.args[1])})"
+        lo = f"min({r}, {n})"
+        hi = f"max({lo}, {n} - {r})"
+        offsets = Offsets(i)
+        if 'constant' == boundary:
+            edge = Mask(offsets, n, keywords.get('cval', ast.Constant(0)))
+        else:
+            edge = Remap(offsets, n, boundary)
+        def loop(start, stop, body):
+            return ast.For(target = ast.Name(i, ast.Store()), iter = _expr(f"range({start}, {stop})"), body = body, orelse = [])
+        def edgebody():
+            return [edge.visit(s) for s in deepcopy(node.body)]
+        stmts = [
+            ast.Assign(targets = [ast.Name(n, ast.Store())], value = node.iter.args[0]),
+            loop(0, lo, edgebody()),
+            loop(lo, hi, node.body), # Interior, every offset in bounds so no checks.
+            loop(hi, n, edgebody()),
+        ]
+        return [ast.fix_missing_locations(ast.copy_location(s, node)) for s in stmts]
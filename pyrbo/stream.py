@@ -0,0 +1,33 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+class Stream: # Subclass must have a turbo process(self, x, out, n) with its state fields of self typed as State.
+
+    def __init__(self, dtype, **state):
+        for name, value in state.items():
+            setattr(self, name, np.full(1, value, dtype))
+
+    def feed(self, chunk):
+        out = np.empty_like(chunk)
+        self.process(chunk, out, len(chunk))
+        return out
+
+    def feedall(self, chunks):
+        for chunk in chunks:
+            yield self.feed(chunk)
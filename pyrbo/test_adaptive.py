@@ -0,0 +1,105 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .adaptive import Adaptive
+from .common import NotSpecialisableException
+from .leaf import turbo, T
+from contextlib import nullcontext
+from unittest import TestCase
+import numpy as np
+
+def kernel(adaptive):
+    @turbo(types = dict(x = [T], n = np.intp, stride = np.intp, i = np.intp, total = T), dynamic = True, adaptive = adaptive)
+    def stridedsum(x, n, stride):
+        total = 0
+        for i in range(n):
+            total += x[i * stride]
+        return total
+    return stridedsum
+
+@turbo(types = dict(x = [T], n = np.intp), dynamic = True, adaptive = Adaptive(['n']))
+def countdown(x, n):
+    while n:
+        n -= 1
+        x[n] = n
+
+class TestAdaptive(TestCase):
+
+    def _check(self, background):
+        adaptive = Adaptive(['n', 'stride'], window = 10, dominance = .8, background = background)
+        f = kernel(adaptive)
+        x = np.arange(20, dtype = np.float64)
+        for k in range(10):
+            self.assertEqual(x[:8:2].sum() if k else x[:5].sum(), f(x, 4, 2) if k else f(x, 5, 1))
+        adaptive.wait()
+        self.assertEqual(dict(specialisations = 1, routes = 1), adaptive.stats())
+        suffix = '_float64_n4_stride2'
+        self.assertIn(suffix, f.decorated.suffixtocomplete)
+        self.assertIn('for i in range(4):', f.decorated.suffixtocomplete[suffix].source())
+        self.assertEqual(x[:8:2].sum(), f(x, 4, 2))
+        self.assertEqual(x[:9:3].sum(), f(x, 3, 3)) # Generic variant.
+
+    def test_foreground(self):
+        self._check(False)
+
+    def test_background(self):
+        self._check(True)
+
+    def test_failure(self):
+        adaptive = Adaptive(['n'], window = 5, background = False)
+        f = kernel(adaptive)
+        x = np.arange(20, dtype = np.float64)
+        decorated = f.decorated
+        getcomplete = decorated.getcomplete
+        def failing(variant):
+            if variant.values:
+                raise MemoryError
+            return getcomplete(variant)
+        decorated.getcomplete = failing
+        for k in range(5):
+            with self.assertLogs('pyrbo.adaptive') if 4 == k else nullcontext():
+                self.assertEqual(x[:8:2].sum(), f(x, 4, 2)) # Generic variant throughout.
+        self.assertEqual(dict(specialisations = 0, routes = 0), adaptive.stats())
+        del decorated.getcomplete
+        for _ in range(5):
+            self.assertEqual(x[:8:2].sum(), f(x, 4, 2))
+        self.assertEqual(dict(specialisations = 1, routes = 1), adaptive.stats())
+
+    def test_keywords(self):
+        adaptive = Adaptive(['n', 'stride'], window = 5, background = False)
+        f = kernel(adaptive)
+        x = np.arange(20, dtype = np.float64)
+        for _ in range(5):
+            self.assertEqual(x[:8:2].sum(), f(x, n = 4, stride = 2))
+        self.assertEqual(dict(specialisations = 1, routes = 1), adaptive.stats())
+        self.assertEqual(x[:8:2].sum(), f(x, 4, stride = 2))
+
+    def test_nosource(self):
+        class Binary: # Like a kernel installed without its source.
+            paramnames = 'x', 'n'
+            @property
+            def body(self):
+                raise OSError
+        adaptive = Adaptive(['n'], window = 1, background = False)
+        complete = object()
+        for _ in range(2):
+            self.assertIs(complete, adaptive(Binary(), None, (None, 4), {}, complete))
+        self.assertEqual(dict(specialisations = 0, routes = 0), adaptive.stats())
+
+    def test_assigned(self):
+        with self.assertRaises(NotSpecialisableException):
+            countdown(np.zeros(3), 3)
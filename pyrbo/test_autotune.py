@@ -0,0 +1,64 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import isa, model
+from .autotune import autotune, candidates
+from .bench import Timer
+from .leaf import turbo, T
+from .model import Build, machine
+from .unroll import Binary, Remainder
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np
+
+@turbo(types = dict(n = np.uint32, seed = T, acc = T), dynamic = True)
+def iterate(n, seed):
+    acc = seed
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T], out = [T]), dynamic = True)
+def tsum(n, x, y, out):
+    for i in range(n):
+        out[i] = x[i] + y[i]
+
+class TestAutotune(TestCase):
+
+    def test_works(self):
+        builds = [Build(Binary(4)), Build(Remainder(4), ['-O1'])]
+        winner = autotune(iterate, (np.uint32(50), np.uint32(1)), builds, Timer(0, 3))
+        self.assertEqual(iterate[T, np.uint32].info.build, winner.info.build)
+        self.assertIn(winner.info.build, builds)
+        variant = winner.info.variant
+        self.assertEqual(repr(winner.info.build), repr(iterate.decorated.tunedbuild(variant)))
+        iterate.decorated.suffixtocomplete.clear() # Like a new process.
+        f = iterate[T, np.uint32]
+        self.assertEqual(repr(winner.info.build), repr(f.info.build))
+        self.assertEqual(winner.info.fqmodulename, f.info.fqmodulename)
+        self.assertEqual(4, f(2, np.uint32(0)))
+
+    def test_candidates(self):
+        self.assertEqual(15, len(candidates(iterate.decorated)))
+        self.assertEqual(3, len(candidates(tsum.decorated)))
+
+    def test_machine(self):
+        key = machine()
+        with patch.object(model.platform, 'node', lambda: 'otherhost'):
+            self.assertEqual(key, machine())
+        with patch.object(isa, 'cpuflags', lambda: {'sse2'}):
+            self.assertNotEqual(key, machine())
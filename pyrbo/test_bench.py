@@ -0,0 +1,58 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .bench import compare, Stats, Suite, Timer
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase
+
+class TestStats(TestCase):
+
+    def test_works(self):
+        stats = Stats(range(100, 0, -1))
+        self.assertEqual(50.5, stats.median())
+        self.assertEqual((41, 60), stats.ci())
+        self.assertEqual(dict(median = 50.5, low = 41, high = 60, n = 100), stats.todict())
+
+    def test_small(self):
+        self.assertEqual((5, 5), Stats([5]).ci())
+
+class TestCompare(TestCase):
+
+    def test_works(self):
+        old = dict(results = dict(a = dict(median = 100, low = 90, high = 110), b = dict(median = 100, low = 90, high = 110), c = dict(median = 1, low = 1, high = 1)))
+        new = dict(results = dict(a = dict(median = 200, low = 150, high = 250), b = dict(median = 105, low = 95, high = 115)))
+        out = StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(['a'], compare(old, new))
+        self.assertEqual(['a: 100 -> 200 ns (2.000x) SLOWER', 'b: 100 -> 105 ns (1.050x)'], out.getvalue().splitlines())
+
+class TestSuite(TestCase):
+
+    def test_dispatch(self):
+        results = Suite(Timer(1, 3), 1).run(['dispatch', 'arraycall'])
+        self.assertEqual({'dispatch.bound', 'dispatch.dynamic', 'arraycall.bound', 'arraycall.dynamic'}, results.keys())
+        for stats in results.values():
+            self.assertEqual(3, stats['n'])
+            self.assertLessEqual(stats['low'], stats['median'])
+
+    def test_importtime(self):
+        results = Suite(Timer(1, 3), 2).run(['importtime'])
+        self.assertEqual({'importtime.pyrbo', 'importtime.many'}, results.keys())
+        for stats in results.values():
+            self.assertEqual(2, stats['n'])
+            self.assertLess(0, stats['low'])
@@ -0,0 +1,85 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import cache
+from .leaf import turbo, T
+from importlib.machinery import EXTENSION_SUFFIXES
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np, os, subprocess, sys
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], acc = T))
+def total(n, x):
+    acc = 0
+    for i in range(n):
+        acc += x[i]
+    return acc
+
+script = '''import numpy as np
+from pyrbo.test_cache import total
+from pyrbo import T
+print(total[T, np.int64](np.uint32(3), np.arange(3, dtype = np.int64)))
+'''
+
+class TestCache(TestCase):
+
+    def _run(self, **env):
+        return subprocess.run([sys.executable, '-c', script], env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path), **env),
+                stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True, check = True)
+
+    def test_hit(self):
+        binary = Path(__file__).parent / 'test_cache_turbo' / f"total_int64{EXTENSION_SUFFIXES[0]}"
+        with TemporaryDirectory() as cachedir:
+            for expected in 'Compiling:', 'Cached:':
+                if binary.exists():
+                    binary.unlink()
+                result = self._run(PYRBO_CACHE = cachedir)
+                self.assertEqual('3\n', result.stdout)
+                self.assertIn(f"{expected} total_int64", result.stderr)
+            self.assertEqual(1, len(os.listdir(cachedir)))
+
+    def test_builddir(self):
+        binary = Path(__file__).parent / 'test_cache_turbo' / f"total_int64{EXTENSION_SUFFIXES[0]}"
+        if binary.exists():
+            binary.unlink()
+        with TemporaryDirectory() as builddir:
+            self.assertEqual('3\n', self._run(PYRBO_CACHE = '', PYRBO_BUILD_DIR = builddir).stdout)
+            self.assertTrue(list(Path(builddir).rglob('total_int64.o')))
+
+    def test_compilerenv(self):
+        with patch.dict(os.environ, CC = 'cc -pthread'), patch.object(cache, 'compilerwrapper', lambda: '/usr/bin/ccache'):
+            with cache.compilerenv():
+                self.assertEqual('/usr/bin/ccache cc -pthread', os.environ['CC'])
+            self.assertEqual('cc -pthread', os.environ['CC'])
+
+    def test_key(self):
+        k = cache.key('m', 'text')
+        self.assertEqual(k, cache.key('m', 'text'))
+        with patch.dict(os.environ, CC = 'clang'):
+            self.assertNotEqual(k, cache.key('m', 'text'))
+        with patch.object(cache.platform, 'machine', lambda: 'aarch64'):
+            self.assertNotEqual(k, cache.key('m', 'text'))
+        with patch.object(cache.np, '__version__', '0.0'):
+            self.assertNotEqual(k, cache.key('m', 'text'))
+        with patch.object(cache, 'compilerversion', lambda: 'cc (GCC) 1.0'):
+            self.assertNotEqual(k, cache.key('m', 'text'))
+        native = cache.key('m', '-march=native')
+        with patch.object(cache.isa, 'cpuflags', lambda: {'sse2'}):
+            self.assertNotEqual(native, cache.key('m', '-march=native'))
+            self.assertEqual(k, cache.key('m', 'text'))
@@ -0,0 +1,61 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import turbo, T
+from unittest import TestCase
+import ctypes, numpy as np
+
+try:
+    from scipy.integrate import quad
+except ImportError:
+    quad = None
+
+@turbo(types = dict(x = T), returns = T)
+def square(x):
+    return x * x
+
+@turbo(types = dict(n = np.int32, x = np.float64), returns = np.float32)
+def scaled(n, x):
+    return n * x
+
+@turbo(types = dict(v = [T]), returns = T)
+def first(v):
+    return v[0]
+
+class TestCapsule(TestCase):
+
+    def _capsulename(self, capsule):
+        getname = ctypes.pythonapi.PyCapsule_GetName
+        getname.restype = ctypes.c_char_p
+        getname.argtypes = [ctypes.py_object]
+        return getname(capsule).decode()
+
+    def test_signature(self):
+        self.assertEqual('double (double)', self._capsulename(square[T, np.float64].capsule))
+        self.assertEqual('float (float)', self._capsulename(square[T, np.float32].capsule))
+        self.assertEqual('float (int, double)', self._capsulename(scaled.capsule))
+        self.assertEqual(6.25, square[T, np.float64](2.5))
+
+    def test_notscalar(self):
+        with self.assertRaises(AttributeError):
+            first[T, np.float64].capsule
+
+    def test_quad(self):
+        if quad is None:
+            self.skipTest('scipy not available.')
+        value, _ = quad(square[T, np.float64].lowlevelcallable, 0, 3)
+        self.assertAlmostEqual(9, value)
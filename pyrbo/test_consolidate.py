@@ -0,0 +1,67 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .dist import prepare
+from .leaf import turbo, T
+from unittest import TestCase
+import numpy as np, os, subprocess, sys
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T]), consolidate = True)
+def double(n, x):
+    for i in range(n):
+        x[i] *= 2
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], acc = T), consolidate = True)
+def total(n, x):
+    acc = 0
+    for i in range(n):
+        acc += x[i]
+    return acc
+
+script = '''import numpy as np, sys
+from pyrbo.test_consolidate import double, total
+from pyrbo import T
+for dtype in np.int32, np.float64:
+    for kernel in double, total:
+        f = kernel[T, dtype]
+        f(np.uint32(2), np.ones(2, dtype = dtype))
+        print(f.f.__module__)
+'''
+
+class TestConsolidate(TestCase):
+
+    def test_works(self):
+        x = np.ones(3, dtype = np.int32)
+        f = double[T, np.int32]
+        f(np.uint32(3), x)
+        self.assertEqual([2, 2, 2], list(x))
+        g = total[T, np.float64]
+        self.assertEqual(6, g(np.uint32(3), np.full(3, 2, dtype = np.float64)))
+        fileparent = f.info.fileparent()
+        self.assertTrue(f.f.__module__.endswith('._consolidated'))
+        includes = (fileparent / '_consolidated.pyx').read_text()
+        self.assertIn("include 'double_int32.pxi'", includes)
+        self.assertIn("include 'total_float64.pxi'", includes)
+        def run():
+            return subprocess.check_output([sys.executable, '-c', script],
+                    env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)), universal_newlines = True).splitlines()
+        self.assertEqual(['pyrbo.test_consolidate_turbo._consolidated'], sorted(set(run()[:1] + run()))) # Rebuilt with all four.
+        self.assertEqual([], sorted(p.name for p in fileparent.iterdir() if p.name.startswith(('double', 'total')) and p.suffix != '.pxi'))
+
+    def test_prepareloaded(self):
+        double[T, np.int32](np.uint32(1), np.ones(1, dtype = np.int32))
+        self.assertIn('pyrbo.test_consolidate_turbo._consolidated', [e.name for e in prepare('pyrbo', {'test_consolidate': {'double': [{'T': 'int32'}]}})])
@@ -0,0 +1,66 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .dist import prepare
+from .leaf import turbo, T
+from Cython.Build import cythonize
+from importlib.machinery import EXTENSION_SUFFIXES
+from pathlib import Path
+from setuptools import Distribution
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import numpy as np, os, shutil, subprocess, sys
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T]))
+def scale(n, x, y):
+    for i in range(n):
+        y[i] = x[i] * 3
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32))
+def triple(n):
+    acc = n * 3
+    return acc
+
+manifest = dict(test_dist = dict(scale = [dict(T = 'float32'), dict(T = 'int16')], triple = [{}]))
+script = '''import numpy as np
+from pyrbo.test_dist import scale, triple
+from pyrbo import T
+y = np.empty(2, dtype = np.int16)
+scale[T, np.int16](np.uint32(2), np.array([1, 2], dtype = np.int16), y)
+print(list(y), triple(np.uint32(5)))
+'''
+
+class TestDist(TestCase):
+
+    def test_prepare(self):
+        self.assertEqual(['pyrbo.test_dist_turbo.scale_float32', 'pyrbo.test_dist_turbo.scale_int16', 'pyrbo.test_dist_turbo.triple'],
+                [e.name for e in prepare('pyrbo', manifest)])
+
+    def test_nocompiler(self):
+        turbodir = Path(__file__).parent / 'test_dist_turbo'
+        with TemporaryDirectory() as tempdir:
+            exts = cythonize(prepare('pyrbo', manifest), include_path = [np.get_include()], quiet = True) # As extensions does with the package's manifest.
+            dist = Distribution(dict(ext_modules = exts, script_args = ['-q', 'build_ext', '--build-lib', tempdir, '--build-temp', os.path.join(tempdir, 'temp')]))
+            dist.parse_command_line()
+            dist.run_commands()
+            shutil.rmtree(turbodir) # Like an installed wheel, no sources.
+            shutil.copytree(Path(tempdir, 'pyrbo', 'test_dist_turbo'), turbodir)
+        self.assertEqual(3, len([p for p in turbodir.iterdir() if p.name.endswith(EXTENSION_SUFFIXES[0])]))
+        result = subprocess.run([sys.executable, '-c', script], env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path), CC = 'false', PYRBO_CACHE = ''),
+                stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True, check = True)
+        self.assertEqual('[3, 6] 15\n', result.stdout)
+        self.assertNotIn('Compiling:', result.stderr)
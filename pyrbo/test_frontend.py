@@ -0,0 +1,67 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .frontend import EliminateDeadBranches, Emitter, FoldConsts, parsefunction, transform
+from .leaf import turbo, X
+from .unroll import Binary, Unroll
+from unittest import TestCase
+import numpy as np
+
+k = None
+
+@turbo(types = dict(x = int, k = X))
+def choose(x):
+    if k > 5 and True:
+        return x * (k - 1)
+    else:
+        return x + 100
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32))
+def triple(
+        n):
+    acc = 0
+    for UNROLL in range(
+            n):
+        acc += 3
+    return acc
+
+def deadwhile(n):
+    while 1 < 0:
+        n += 1
+    for _ in range(n):
+        if not True:
+            n -= 1
+    return n
+
+class TestFrontend(TestCase):
+
+    def test_fold(self):
+        self.assertEqual(35, choose[X, 6](7))
+        self.assertEqual(107, choose[X, 5](7))
+        text = choose[X, 6].source()
+        self.assertNotIn('if ', text)
+        self.assertIn('    return x * 5\n', text)
+
+    def test_multiline(self):
+        self.assertEqual(21, triple(7))
+
+    def test_passes(self):
+        emitter = Emitter(__file__)
+        emitter.block(transform(parsefunction(deadwhile).body, [FoldConsts(), EliminateDeadBranches(), Unroll(Binary())], {}), 0)
+        self.assertEqual(['for _ in range(n):', '    pass', 'return n'], [l.text for l in emitter.lines])
+        self.assertEqual([True, True, False], [l.inloop for l in emitter.lines])
+        self.assertEqual(f"{__file__}:{deadwhile.__code__.co_firstlineno + 3}", emitter.lines[0].location)
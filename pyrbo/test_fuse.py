@@ -0,0 +1,96 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NotFusableException
+from .fuse import fuse
+from .leaf import turbo, T
+from unittest import TestCase
+import numpy as np, sys
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T], out = [T]), dynamic = True)
+def tsum(n, x, y, out):
+    for i in range(n):
+        out[i] = x[i] + y[i]
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, out = [T], k = T), dynamic = True)
+def scale(n, out, k):
+    for i  in range( n ):
+            out[i] *= k
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, out = [T], lo = T, hi = T, v = T), dynamic = True)
+def clip(n, out, lo, hi):
+    for i in range(n):
+        # Intermediate stays in a register:
+        v = out[i]
+        out[i] = min(max(v, lo), hi)
+
+@turbo(types = dict(j = np.uint32, n = np.uint32, out = [T]), dynamic = True)
+def otherindex(n, out):
+    for j in range(n):
+        out[j] = 0
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, out = [T], y = [T]), dynamic = True)
+def reverse(n, out, y):
+    for i in range(n):
+        y[i] = out[n - 1 - i] # Not yet written by tsum when fused.
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], out = [T]), dynamic = True)
+def backwards(n, x, out):
+    for i in range(n):
+        out[n - 1 - i] = x[i] # Not yet written when fused with a later reader of out[i].
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, out = [T]), dynamic = True)
+def early(n, out):
+    for i in range(n):
+        return out[i]
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, out = [np.float64]))
+def float64out(n, out):
+    for i in range(n):
+        out[i] = 0
+
+class TestFuse(TestCase):
+
+    def test_works(self):
+        n = 10
+        x = np.arange(n, dtype = np.float32)
+        y = np.arange(n, dtype = np.float32) * 2
+        expected = np.empty(n, dtype = np.float32)
+        tsum(n, x, y, expected)
+        scale(n, expected, 1.5)
+        clip(n, expected, 3, 30)
+        actual = np.empty(n, dtype = np.float32)
+        f = fuse(tsum, scale, clip)
+        f(n, x, y, actual, 1.5, 3, 30)
+        self.assertEqual(list(expected), list(actual))
+        self.assertIn(f"{__name__}_turbo.tsumTHENscaleTHENclip_float32", sys.modules)
+        actual[:] = 0
+        fuse(tsum[T, np.float32], scale)(n, x, y, actual, 1.5)
+        self.assertEqual(list((x + y) * 1.5), list(actual))
+
+    def test_incompatible(self):
+        for k in otherindex, reverse, early, float64out:
+            with self.assertRaises(NotFusableException):
+                fuse(tsum, k)
+
+    def test_writeafterread(self):
+        with self.assertRaises(NotFusableException):
+            fuse(reverse, scale) # Scale would overwrite elements reverse has yet to read.
+
+    def test_storeelsewhere(self):
+        with self.assertRaises(NotFusableException):
+            fuse(backwards, scale)
@@ -0,0 +1,45 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import turbo, T
+from unittest import TestCase
+import numpy as np
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T], out = [T]), dynamic = True)
+def tsum(n, x, y, out):
+    for i in range(n):
+        out[i] = x[i] + y[i]
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T]), dynamic = True)
+def slow(n, x):
+    for i in range(n):
+        x[i] = len(str(x[i]))
+
+class TestInspect(TestCase):
+
+    def test_source(self):
+        text = tsum[T, np.float32].source()
+        self.assertIn('def tsum_float32(np.uint32_t n, np.ndarray[np.float32_t] py_x, ', text)
+        self.assertIn('        out[i] = x[i] + y[i]\n', text)
+
+    def test_annotate(self):
+        f = tsum[T, np.float64]
+        self.assertTrue(f.annotate().read_text().startswith('<!DOCTYPE html>'))
+        texts = [l.text for l in f.pythonlines()]
+        self.assertIn('def tsum_float64(np.uint32_t n, np.ndarray[np.float64_t] py_x, np.ndarray[np.float64_t] py_y, np.ndarray[np.float64_t] py_out):', texts)
+        self.assertNotIn('        out[i] = x[i] + y[i]', texts)
+        self.assertIn('        x[i] = len(str(x[i]))', [l.text for l in slow[T, np.float64].pythonlines()])
@@ -0,0 +1,73 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import isa
+from .isa import best, names, supported
+from .leaf import turbo, T
+from .model import Build, nocompile
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np, platform
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T]), isas = True)
+def scale(n, x, y):
+    for i in range(n):
+        y[i] = x[i] * 2
+
+class TestISA(TestCase):
+
+    v3 = {'cx16', 'lahf_lm', 'popcnt', 'pni', 'sse4_1', 'sse4_2', 'ssse3', 'abm', 'avx', 'avx2', 'bmi1', 'bmi2', 'f16c', 'fma', 'movbe', 'xsave'}
+
+    def test_levels(self):
+        if 'x86_64' != platform.machine():
+            self.skipTest('Not x86-64.')
+        self.assertEqual(['x86-64'], supported(set()))
+        self.assertEqual(names[:3], supported(self.v3))
+        self.assertEqual(names[:3], supported(self.v3 | {'avx512f'}))
+        self.assertEqual(names[:2], supported(self.v3 - {'avx2'}))
+        self.assertEqual('x86-64-v3', best(names, self.v3))
+        self.assertEqual('x86-64-v2', best(names[:2], self.v3))
+        self.assertEqual('x86-64', best(['x86-64', 'x86-64-v4'], self.v3))
+        self.assertEqual(None, best([]))
+
+    def test_load(self):
+        x = np.arange(5, dtype = np.float32)
+        y = np.empty_like(x)
+        f = scale[T, np.float32]
+        f(5, x, y)
+        self.assertEqual([0, 2, 4, 6, 8], list(y))
+        self.assertEqual(best(names), f.isa)
+        if f.isa is not None:
+            self.assertIn(f"-march={f.isa}", f.info.build.compileargs())
+            self.assertIn(f.isa, repr(f.info.build))
+
+    def test_prepare(self):
+        with nocompile:
+            f = scale[T, np.int16]
+        suffixes = set(p.stem[len('scale_int16'):] for p in f.info.fileparent().glob('scale_int16_*.pyx'))
+        self.assertEqual(set(Build(scale.decorated.unroll, isa = level).suffix() for level in names), suffixes) # Every level, whatever this host supports.
+
+    def test_fallback(self):
+        if 'x86_64' != platform.machine():
+            self.skipTest('Not x86-64.')
+        with patch.object(isa, 'best', lambda isas: 'x86-64-v9'), self.assertLogs('pyrbo.model'): # No compiler knows this level.
+            f = scale[T, np.float64]
+        self.assertEqual(names[0], f.isa)
+        x = np.arange(3, dtype = np.float64)
+        y = np.empty_like(x)
+        f(3, x, y)
+        self.assertEqual([0, 2, 4], list(y))
@@ -0,0 +1,40 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os, subprocess, sys
+
+source = '''from pyrbo import turbo, T
+import numpy as np
+
+@turbo(types = dict(x = [T]), dynamic = True)
+def f(x):
+    pass
+'''
+
+toolchain = 'Cython', 'initnative', 'pyximport', 'pyrbo.cache', 'subprocess', 'sysconfig', 'shlex'
+
+class TestLazy(TestCase):
+
+    def test_works(self):
+        with TemporaryDirectory() as tempdir:
+            (Path(tempdir) / 'pyrbolazy.py').write_text(source)
+            env = dict(os.environ, PYTHONPATH = os.pathsep.join([str(Path(__file__).parent.parent), tempdir]))
+            loaded = subprocess.check_output([sys.executable, '-c', f"import pyrbolazy, sys; print(*(m for m in {toolchain!r} if m in sys.modules))"], env = env, text = True)
+        self.assertEqual('', loaded.strip())
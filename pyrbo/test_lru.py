@@ -0,0 +1,50 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import turbo, X, Y
+from unittest import TestCase
+import numpy as np, sys
+
+y = None
+
+@turbo(types = dict(x = X, y = Y), maxvariants = 2)
+def addy(x):
+    return x + y
+
+@turbo(types = dict(x = X))
+def addy_sq(x): # Shares the prefix, so prune of addy must leave it alone.
+    return x * x
+
+class TestLRU(TestCase):
+
+    def test_works(self):
+        decorated = addy.decorated
+        for k in range(4):
+            self.assertEqual(k + 1, addy[X, np.int32][Y, k](1))
+        self.assertEqual(['_int32_2', '_int32_3'], list(decorated.suffixtocomplete))
+        self.assertNotIn(f"{__name__}_turbo.addy_int32_0", sys.modules)
+        self.assertIn(f"{__name__}_turbo.addy_int32_3", sys.modules)
+        addy[X, np.int32][Y, 2](1)
+        usage = decorated.usage()
+        self.assertEqual(['_int32_3', '_int32_2'], [u.suffix for u in usage])
+        self.assertTrue(all(u.size > 0 for u in usage))
+        self.assertLess(usage[0].lastuse, usage[1].lastuse) # Stamped on every hit of a bounded cache.
+        self.assertEqual(4, addy_sq[X, np.int32](2))
+        self.assertEqual(['addy_int32_0', 'addy_int32_1'], decorated.prune())
+        self.assertEqual([], decorated.prune())
+        self.assertEqual(['addy_int32_2.pyx', 'addy_int32_3.pyx', 'addy_sq_int32.pyx'], sorted(p.name for p in decorated.fileparent().glob('addy*.pyx')))
+        self.assertEqual(1, addy[X, np.int32][Y, 0](1)) # Rebuilt, or fetched from the cache.
@@ -0,0 +1,96 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NoTrainingException, UnsupportedCompilerException
+from .leaf import turbo, T
+from .pgo import pgo
+from .unroll import isgcc
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np, os, shutil, subprocess, sys
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], threshold = T, count = np.uint32), dynamic = True)
+def crossings(n, x, threshold):
+    count = 0
+    for i in range(n):
+        if x[i] > threshold:
+            count += 1
+    return count
+
+script = '''import numpy as np
+from pyrbo.test_pgo import crossings
+from pyrbo import T
+print(crossings[T, np.int32](np.uint32(3), np.arange(3, dtype = np.int32), np.int32(0)))
+'''
+
+class TestPGO(TestCase):
+
+    def setUp(self):
+        if not isgcc():
+            self.skipTest('Profile flags are GCC-only.')
+
+    def _usebuild(self, info):
+        info.removebinaries()
+        return subprocess.run([sys.executable, '-c', script], env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path), PYRBO_CACHE = '', PYRBO_CCACHE = '0'),
+                stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True, check = True)
+
+    def test_consumed(self):
+        x = np.arange(100, dtype = np.int32) % 10
+        info = pgo(crossings, [(np.uint32(100), x, np.int32(4))] * 5).info
+        result = self._usebuild(info)
+        self.assertEqual('2\n', result.stdout)
+        self.assertIn(f"Compiling: {info.groupname}", result.stderr)
+        self.assertNotIn('missing-profile', result.stderr)
+        profiledir = info.profiledir()
+        aside = profiledir.with_name(f"{profiledir.name}.aside")
+        profiledir.rename(aside)
+        try:
+            self.assertIn('missing-profile', self._usebuild(info).stderr) # So the absence above means the profile was read.
+        finally:
+            shutil.rmtree(profiledir, ignore_errors = True)
+            aside.rename(profiledir)
+            info.removebinaries()
+
+    def test_works(self):
+        x = np.arange(100, dtype = np.int32) % 10
+        complete = pgo(crossings, [(np.uint32(100), x, np.int32(4))] * 5)
+        self.assertEqual(50, complete(np.uint32(100), x, np.int32(4)))
+        build = complete.info.build
+        self.assertIsNotNone(build.profile)
+        self.assertFalse(build.training)
+        self.assertTrue(any(complete.info.profiledir().iterdir()))
+        variant = complete.info.variant
+        self.assertEqual(repr(build), repr(crossings.decorated.tunedbuild(variant)))
+        crossings.decorated.suffixtocomplete.clear()
+        self.assertEqual(complete.info.fqmodulename, crossings[T, np.int32].info.fqmodulename)
+
+    def test_callable(self):
+        def train(kernel):
+            for k in range(3):
+                kernel(np.uint32(10), np.full(10, k, dtype = np.float64), 1.5)
+        complete = pgo(crossings, train)
+        self.assertEqual(2, complete(np.uint32(3), np.array([1, 2, 3], dtype = np.float64), 1.0))
+
+class TestPGOArgs(TestCase):
+
+    def test_notraining(self):
+        with patch('pyrbo.pgo.isgcc', lambda: True), self.assertRaises(NoTrainingException):
+            pgo(crossings, [])
+
+    def test_notgcc(self):
+        with patch('pyrbo.pgo.isgcc', lambda: False), self.assertRaises(UnsupportedCompilerException):
+            pgo(crossings, [])
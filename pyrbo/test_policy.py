@@ -0,0 +1,95 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import CompileBudgetException, NoCastException
+from .leaf import turbo, T
+from .policy import Policy
+from unittest import TestCase
+import numpy as np
+
+def kernel(policy):
+    @turbo(types = dict(x = [T], y = [T], n = np.intp, i = np.intp), dynamic = True, policy = policy)
+    def scaleinto(x, y, n):
+        for i in range(n):
+            y[i] = x[i] * 2
+    return scaleinto
+
+@turbo(types = dict(x = [T], n = np.intp, i = np.intp, total = np.float64), dynamic = True, policy = Policy(dict([(T, [np.float32])])))
+def total32(x, n):
+    total = 0
+    for i in range(n):
+        total += x[i]
+    return total
+
+class TestPolicy(TestCase):
+
+    def test_readonlyarg(self):
+        x = np.array([.1, 1 / 3, 1e-50])
+        before = x.copy()
+        self.assertAlmostEqual(x.sum(), total32(x, 3), 6)
+        self.assertTrue(np.array_equal(before, x)) # Not written, so not copied back.
+
+    def test_allowed(self):
+        policy = Policy(dict([(T, [np.float32, np.float64])]))
+        f = kernel(policy)
+        x = np.arange(5, dtype = np.int16)
+        y = np.zeros(5) # Written, so copied back, which same_kind allows.
+        f(x, y, 5)
+        self.assertEqual([0, 2, 4, 6, 8], list(y))
+        self.assertEqual(['_float32'], list(f.decorated.suffixtocomplete))
+        self.assertEqual(dict(compiles = 1, casts = 2, refusals = 0), policy.stats())
+        x = np.arange(5, dtype = np.float64)
+        y = np.zeros(5, dtype = np.float32) # Would be a dtype mismatch without a policy.
+        f(x, y, 5)
+        self.assertEqual([0, 2, 4, 6, 8], list(y))
+        self.assertEqual(['_float32', '_float64'], list(f.decorated.suffixtocomplete))
+        self.assertEqual(dict(compiles = 2, casts = 3, refusals = 0), policy.stats())
+        with self.assertRaises(NoCastException):
+            f(np.zeros(1, dtype = np.complex64), np.zeros(1, dtype = np.complex64), 1)
+
+    def test_nocopyback(self):
+        policy = Policy(dict([(T, [np.float32])]))
+        f = kernel(policy)
+        x = np.arange(5, dtype = np.int16)
+        y = np.zeros(5, dtype = np.int16) # Written, but float32 doesn't cast back under same_kind.
+        with self.assertRaises(NoCastException):
+            f(x, y, 5)
+        self.assertEqual(0, policy.stats()['casts'])
+
+    def test_keywords(self):
+        policy = Policy(dict([(T, [np.float32])]))
+        f = kernel(policy)
+        x = np.arange(5, dtype = np.float32)
+        y = np.zeros(5) # Float64, so cast like a positional arg.
+        f(x, y = y, n = 5)
+        self.assertEqual([0, 2, 4, 6, 8], list(y))
+        self.assertEqual(dict(compiles = 1, casts = 1, refusals = 0), policy.stats())
+
+    def test_budget(self):
+        policy = Policy(budget = 1)
+        f = kernel(policy)
+        x = np.arange(5, dtype = np.int32)
+        y = np.zeros(5, dtype = np.int32)
+        f(x, y, 5)
+        f(x.astype(np.int16), y, 5) # Fits the int32 variant.
+        self.assertEqual([0, 2, 4, 6, 8], list(y))
+        self.assertEqual(['_int32'], list(f.decorated.suffixtocomplete))
+        with self.assertRaises(CompileBudgetException):
+            f(x.astype(np.float64), y.astype(np.float64), 5)
+        with self.assertRaises(CompileBudgetException): # Would lose range in the int32 variant.
+            f(x.astype(np.int64), y.astype(np.int64), 5)
+        self.assertEqual(dict(compiles = 1, casts = 1, refusals = 2), policy.stats())
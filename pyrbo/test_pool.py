@@ -0,0 +1,107 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import turbo, T
+from .pool import Pool, pool, release, scope, stats
+from unittest import TestCase
+import numpy as np, threading
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T], out = [T]), dynamic = True, outputs = dict(out = 'x'))
+def tsum(n, x, y, out):
+    for i in range(n):
+        out[i] = x[i] + y[i]
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], lo = [T], hi = [T], count = np.uint32), dynamic = True, outputs = dict(lo = 'n', hi = lambda n, x: x.shape))
+def split(n, x, lo, hi):
+    count = 0
+    for i in range(n):
+        lo[i] = x[i] - 1
+        hi[i] = x[i] + 1
+        count += 1
+    return count
+
+class TestPool(TestCase):
+
+    def test_outputs(self):
+        x = np.arange(4, dtype = np.float32)
+        with scope():
+            out = tsum(np.uint32(4), x, x)
+            self.assertEqual(np.float32, out.dtype)
+            self.assertEqual([0, 2, 4, 6], list(out))
+            before = stats()
+            explicit = np.empty(4, dtype = np.float32)
+            self.assertIsNone(tsum(np.uint32(4), x, x, explicit))
+            self.assertIsNone(tsum(np.uint32(4), x, x, out = explicit))
+            self.assertEqual(before, stats())
+            self.assertEqual([0, 2, 4, 6], list(tsum(np.uint32(4), x, y = x)))
+        after = stats()
+        self.assertEqual(0, after['outstanding'])
+        out = tsum(np.uint32(4), x, x)
+        self.assertEqual(after['hits'] + 1, stats()['hits'])
+        release(out)
+
+    def test_method(self):
+        x = np.arange(4, dtype = np.float32)
+        out = tsum[T, np.float32].__get__(np.uint32(4), None)(x, x) # Bound like a method, outputs still allocated.
+        self.assertEqual([0, 2, 4, 6], list(out))
+        release(out)
+
+    def test_several(self):
+        count, lo, hi = split(np.uint32(3), np.array([5, 6, 7], dtype = np.int16))
+        self.assertEqual(3, count)
+        self.assertEqual([4, 5, 6], list(lo))
+        self.assertEqual([6, 7, 8], list(hi))
+        release(lo, hi)
+
+    def test_buckets(self):
+        p = Pool()
+        a = p.acquire((3, 2), np.float64)
+        self.assertEqual((3, 2), a.shape)
+        p.release(a)
+        b = p.acquire(7, np.float64) # Same bucket of 8.
+        self.assertEqual(dict(hits = 1, misses = 1, outstanding = 1, pooled = 0), p.stats())
+        p.release(b)
+        c = p.acquire(9, np.float64)
+        d = p.acquire(7, np.float32)
+        self.assertEqual(dict(hits = 1, misses = 3, outstanding = 2, pooled = 1), p.stats())
+        del c, d
+
+    def test_dropped(self):
+        p = Pool()
+        a = p.acquire(4, np.float64)
+        view = a[1:]
+        del a
+        self.assertEqual(dict(hits = 0, misses = 1, outstanding = 1, pooled = 0), p.stats()) # Still reachable via the view.
+        del view
+        self.assertEqual(dict(hits = 0, misses = 1, outstanding = 0, pooled = 1), p.stats())
+        p.acquire(4, np.float64)
+        self.assertEqual(dict(hits = 1, misses = 1, outstanding = 0, pooled = 1), p.stats())
+
+    def test_droppedoutput(self):
+        x = np.arange(4, dtype = np.float32)
+        before = stats()
+        tsum(np.uint32(4), x, x) # Never released.
+        after = stats()
+        self.assertEqual(before['outstanding'], after['outstanding'])
+        self.assertTrue(after['pooled'])
+
+    def test_threadlocal(self):
+        pools = [pool()]
+        t = threading.Thread(target = lambda: pools.append(pool()))
+        t.start()
+        t.join()
+        self.assertIsNot(*pools)
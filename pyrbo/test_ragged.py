@@ -0,0 +1,69 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import LOCAL, turbo, T
+from .ragged import Ragged
+from unittest import TestCase
+import numpy as np
+
+@turbo(types = dict(rows = Ragged[T], out = [T], i = np.int64, j = np.int64, acc = T), dynamic = True)
+def rowsums(rows, out):
+    rows_n = LOCAL
+    rows_offsets = LOCAL
+    rows_values = LOCAL
+    for i in range(rows_n):
+        acc = 0
+        for j in range(rows_offsets[i], rows_offsets[i + 1]):
+            acc += rows_values[j]
+        out[i] = acc
+
+@turbo(types = dict(rows = Ragged[np.float64, np.int32], out = [np.float64], i = np.int64, j = np.int64))
+def rowmax(rows, out):
+    rows_n = LOCAL
+    rows_offsets = LOCAL
+    rows_values = LOCAL
+    for i in range(rows_n):
+        out[i] = -1
+        for j in range(rows_offsets[i], rows_offsets[i + 1]):
+            if rows_values[j] > out[i]:
+                out[i] = rows_values[j]
+
+class TestRagged(TestCase):
+
+    def test_fromlists(self):
+        rows = Ragged.fromlists([[1, 2, 3], [], [4, 5]], np.int32)
+        self.assertEqual(3, len(rows))
+        self.assertEqual([4, 5], list(rows[2]))
+        out = np.empty(3, dtype = np.int32)
+        rowsums(rows, out)
+        self.assertEqual([6, 0, 9], list(out))
+        rows = Ragged.fromlists([[.5], [.25, .25]], np.float32)
+        out = np.empty(2, dtype = np.float32)
+        rowsums(rows, out)
+        self.assertEqual([.5, .5], list(out))
+
+    def test_frombuffers(self):
+        values = np.array([9, 1, 2, 3, 4, 5], dtype = np.float64)
+        offsets = np.array([1, 3, 3, 6], dtype = np.int32) # Sliced, so not starting at 0.
+        rows = Ragged.frombuffers(values.tobytes(), offsets.tobytes(), np.float64, np.int32)
+        self.assertEqual(3, len(rows))
+        out = np.empty(3)
+        rowmax(rows, out)
+        self.assertEqual([2, -1, 5], list(out))
+        rows = Ragged.frombuffers(values.tobytes(), offsets.astype(np.int64).tobytes(), np.float64) # Same default as Ragged[T].
+        rowsums(rows, out)
+        self.assertEqual([3, 0, 12], list(out))
@@ -0,0 +1,114 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NotReducibleException
+from .leaf import REDUCE, turbo, T
+from .reduce import Reduce
+from unittest import TestCase
+import ast, numpy as np
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], acc = T), dynamic = True)
+def total(n, x):
+    acc = 0
+    for i in REDUCE(n):
+        acc += x[i]
+    return acc
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [np.float32], acc = np.float32))
+def serialtotal(n, x):
+    acc = 0
+    for i in range(n):
+        acc += x[i]
+    return acc
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], acc = T), dynamic = True)
+def smallest(n, x):
+    acc = x[0]
+    for i in REDUCE(n, lanes = 8):
+        acc = min(acc, x[i])
+    return acc
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], best = T, besti = np.uint32), dynamic = True)
+def argmax(n, x):
+    best = x[0]
+    besti = 0
+    for i in REDUCE(n):
+        if x[i] > best:
+            best = x[i]
+            besti = i
+    return besti
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], besti = np.uint32, best = T), dynamic = True)
+def lastargmin(n, x):
+    best = x[0]
+    besti = 0
+    for i in REDUCE(n):
+        if x[i] <= best:
+            best = x[i]
+            besti = i
+    return besti
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], acc = T), dynamic = True)
+def bits(n, x):
+    acc = 0
+    for i in REDUCE(n):
+        acc ^= x[i]
+    return acc
+
+class TestReduce(TestCase):
+
+    def test_sum(self):
+        for n in 0, 1, 5, 127, 128, 129, 1000003:
+            x = np.arange(n, dtype = np.int64)
+            self.assertEqual(x.sum(), total(np.uint32(n), x))
+
+    def test_accuracy(self):
+        n = 1 << 22
+        x = np.full(n, .1, dtype = np.float32)
+        exact = n * float(np.float32(.1))
+        self.assertLess(abs(total(np.uint32(n), x) - exact), abs(serialtotal(np.uint32(n), x) - exact) / 100)
+        self.assertAlmostEqual(exact, total(np.uint32(n), x), delta = exact * 1e-6)
+
+    def test_minmax(self):
+        x = np.array([5, 3, 9, 1, 7, 1, 9, 2, 8, 0, 4], dtype = np.int16)
+        for n in range(1, len(x) + 1):
+            self.assertEqual(x[:n].min(), smallest(np.uint32(n), x))
+            self.assertEqual(x[:n].argmax(), argmax(np.uint32(n), x))
+            self.assertEqual(n - 1 - x[:n][::-1].argmin(), lastargmin(np.uint32(n), x))
+
+    def test_xor(self):
+        x = np.arange(1, 12, dtype = np.uint8)
+        self.assertEqual(np.bitwise_xor.reduce(x), bits(np.uint32(len(x)), x))
+
+    def test_notreducible(self):
+        body = ast.parse('''for i in REDUCE(n):
+    acc += acc * x[i]
+''').body
+        with self.assertRaises(NotReducibleException):
+            Reduce()(body, {})
+
+    def test_identity(self):
+        body = ast.parse('''for i in REDUCE(n):
+    acc = hypot(acc, x[i])
+''').body
+        with self.assertRaises(NotReducibleException) as cm:
+            Reduce()(body, {})
+        self.assertIn('associative and commutative', cm.exception.args[1])
+        body = ast.parse('''for i in REDUCE(n, identity = 0):
+    acc = hypot(acc, x[i])
+''').body
+        self.assertIn('acc_lane0 = 0', ast.unparse(Reduce()(body, {})))
@@ -0,0 +1,103 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .bench import Timer
+from .leaf import turbo, T
+from .model import Build
+from .sized import sized
+from .unroll import Binary, Remainder
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+import json, numpy as np
+
+@turbo(types = dict(i = np.intp, n = np.intp, x = [T], y = [T], out = [T]), dynamic = True)
+def vsum(n, x, y, out):
+    for i in range(n):
+        out[i] = x[i] + y[i]
+
+def makeargs(n):
+    x = np.arange(n, dtype = np.float64)
+    return n, x, x, np.empty_like(x)
+
+class FakeTimer: # Prefers the second build from size 100.
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, f):
+        self.calls += 1
+        f()
+        second = not self.calls % 2
+        return Stats(1 if second == (self.calls > 2) else 2)
+
+class Stats:
+
+    def __init__(self, median):
+        self.value = median
+
+    def median(self):
+        return self.value
+
+class NoTimer:
+
+    def __call__(self, f):
+        raise Exception('Should not calibrate again.')
+
+class TestSized(TestCase):
+
+    def test_works(self):
+        builds = [Build(Binary(4)), Build(Remainder(4), ['-O1'])]
+        dispatcher = sized(vsum, makeargs, 'n', builds, [1, 100, 10000], FakeTimer())
+        self.assertEqual([0, 100], dispatcher.starts)
+        self.assertEqual([repr(b) for b in builds], [repr(c.info.build) for c in dispatcher.completes])
+        for n in 0, 5, 500:
+            args = makeargs(n)
+            dispatcher(*args)
+            self.assertTrue(np.array_equal(2 * args[1], args[3]))
+        calibrations = json.loads((vsum.decorated.fileparent() / 'sized.json').read_text())
+        self.assertIn([[0, 0], [100, 1]], [c['segments'] for m in calibrations.values() for c in m.values()])
+        dispatcher = sized(vsum, makeargs, 'n', builds, [1, 100, 10000], NoTimer())
+        self.assertEqual([0, 100], dispatcher.starts)
+        dispatcher = sized(vsum, makeargs, 'x', builds, [1, 100, 10000], NoTimer()) # Size from the array length.
+        args = makeargs(500)
+        dispatcher(*args)
+        self.assertTrue(np.array_equal(2 * args[1], args[3]))
+        n, x, y, out = makeargs(500)
+        dispatcher(n, x, y = y, out = out)
+        self.assertTrue(np.array_equal(2 * x, out))
+        self.assertIn([1, 100, 10000], [c.get('sizes') for m in calibrations.values() for c in m.values()])
+        timer = FakeTimer()
+        sized(vsum, makeargs, 'n', builds, [1, 100], timer) # Other sizes, so calibrated again.
+        self.assertEqual(4, timer.calls)
+
+    def test_readonly(self):
+        builds = [Build(Binary(4)), Build(Remainder(4), ['-O1'])]
+        with patch('pyrbo.sized._path', lambda decorated: Path('/proc/pyrbo/sized.json')): # Not writable even by root.
+            dispatcher = sized(vsum, makeargs, 'n', builds, [1, 1000], FakeTimer())
+        args = makeargs(5)
+        dispatcher(*args)
+        self.assertTrue(np.array_equal(2 * args[1], args[3]))
+
+    def test_realtimer(self):
+        builds = [Build(Binary(4), ['-O0']), Build(Binary(4), ['-O3'])]
+        sizes = [1, 1 << 16]
+        (vsum.decorated.fileparent() / 'sized.json').unlink(missing_ok = True) # Really time it.
+        dispatcher = sized(vsum, makeargs, 'n', builds, sizes, Timer(1, 5))
+        self.assertEqual(0, dispatcher.starts[0])
+        self.assertLessEqual(set(dispatcher.starts[1:]), set(sizes))
+        self.assertEqual(repr(builds[1]), repr(dispatcher.completes[-1].info.build)) # Optimised code wins once the loop dominates.
@@ -0,0 +1,113 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NotStencilException
+from .leaf import LOCAL, STENCIL, turbo, T, U, Y
+from unittest import TestCase
+import numpy as np
+
+radius = None
+
+types = dict(a = [T], b = [T], n = U, i = np.intp, k = np.intp, radius = Y, total = T)
+
+@turbo(types = types)
+def constantsum(a, b, n):
+    for i in STENCIL(n, radius, cval = 1):
+        total = 0
+        for k in range(-radius, radius + 1):
+            total += a[i + k]
+        b[i] = total
+
+@turbo(types = types)
+def reflectsum(a, b, n):
+    for i in STENCIL(n, radius, boundary = 'reflect'):
+        total = 0
+        for k in range(-radius, radius + 1):
+            total += a[i + k]
+        b[i] = total
+
+@turbo(types = types)
+def wrapsum(a, b, n):
+    for i in STENCIL(n, radius, boundary = 'wrap'):
+        total = 0
+        for k in range(-radius, radius + 1):
+            total += a[i + k]
+        b[i] = total
+
+@turbo(types = dict(a = [T], b = [T], n = np.intp, i = np.intp))
+def weighted(a, b, n):
+    for i in STENCIL(n, 1, boundary = 'wrap'):
+        b[i] = (i + 1) * a[i - 1]
+
+@turbo(types = dict(a = [[T]], b = [[T]], i = np.intp, j = np.intp), dynamic = True)
+def laplacian(a, b):
+    i = LOCAL
+    j = LOCAL
+    a_shape0 = LOCAL
+    a_shape1 = LOCAL
+    a_stride0 = LOCAL
+    a_stride1 = LOCAL
+    b_stride0 = LOCAL
+    b_stride1 = LOCAL
+    for i in STENCIL(a_shape0, 1, boundary = 'wrap'):
+        for j in STENCIL(a_shape1, 1, boundary = 'wrap'):
+            b[i * b_stride0 + j * b_stride1] = (a[(i - 1) * a_stride0 + j * a_stride1] + a[(i + 1) * a_stride0 + j * a_stride1]
+                    + a[i * a_stride0 + (j - 1) * a_stride1] + a[i * a_stride0 + (j + 1) * a_stride1] - 4 * a[i * a_stride0 + j * a_stride1])
+
+@turbo(types = dict(a = [T], n = np.intp, i = np.intp))
+def badboundary(a, n):
+    for i in STENCIL(n, 1, boundary = 'nearest'):
+        a[i] = 0
+
+class TestStencil(TestCase):
+
+    def _check(self, kernel, mode, **kwargs):
+        for ntype in np.intp, np.uint32:
+            for radius in 1, 2, 3:
+                for n in 0, 1, 2, 3, 10:
+                    a = np.arange(n, dtype = np.float64) ** 2
+                    b = np.empty_like(a)
+                    kernel[T, np.float64][U, ntype][Y, radius](a, b, n)
+                    if n:
+                        padded = np.pad(a, radius, mode, **kwargs)
+                        self.assertTrue(np.array_equal(np.convolve(padded, np.ones(2 * radius + 1), 'valid'), b))
+
+    def test_constant(self):
+        self._check(constantsum, 'constant', constant_values = 1)
+
+    def test_reflect(self):
+        self._check(reflectsum, 'symmetric')
+
+    def test_wrap(self):
+        self._check(wrapsum, 'wrap')
+
+    def test_offsetvalue(self):
+        a = np.arange(5, dtype = np.float64) ** 2
+        b = np.empty_like(a)
+        weighted[T, np.float64](a, b, 5)
+        self.assertEqual(list(np.arange(1, 6) * np.roll(a, 1)), list(b))
+
+    def test_2d(self):
+        a = np.arange(6 * 7, dtype = np.float64).reshape(6, 7) ** 2
+        b = np.empty_like(a)
+        laplacian(a, b)
+        expected = np.roll(a, 1, 0) + np.roll(a, -1, 0) + np.roll(a, 1, 1) + np.roll(a, -1, 1) - 4 * a
+        self.assertTrue(np.array_equal(expected, b))
+
+    def test_badboundary(self):
+        with self.assertRaises(NotStencilException):
+            badboundary[T, np.int32](np.zeros(3, dtype = np.int32), 3)
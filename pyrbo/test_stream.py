@@ -0,0 +1,72 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import generic, LOCAL, turbo, T
+from .model import State
+from .stream import Stream
+from unittest import TestCase
+import numpy as np
+
+class OnePole(Stream, metaclass = generic):
+
+    def __init__(self, a, dtype):
+        super().__init__(dtype, y = 0)
+        self.a = a
+
+    @turbo(types = dict(self = dict(a = T, y = State(T)), x = [T], out = [T], n = np.intp, i = np.intp), dynamic = True)
+    def process(self, x, out, n):
+        self_a = LOCAL
+        self_y = LOCAL
+        for i in range(n):
+            self_y += self_a * (x[i] - self_y)
+            out[i] = self_y
+
+class Counter(Stream, metaclass = generic):
+
+    def __init__(self):
+        super().__init__(np.int64, count = 0)
+
+    @turbo(types = dict(self = dict(count = State(np.int64)), x = [T], out = [T], n = np.intp, i = np.intp), dynamic = True)
+    def process(self, x, out, n):
+        self_count = LOCAL
+        for i in range(n):
+            out[i] = self_count
+            self_count += 1
+            if x[i] < 0:
+                return # State is still written back.
+
+class TestStream(TestCase):
+
+    def test_onepole(self):
+        signal = np.sin(np.arange(100) * .3) + 1
+        a = .25
+        expected = np.empty_like(signal)
+        y = 0
+        for i, x in enumerate(signal):
+            y += a * (x - y)
+            expected[i] = y
+        f = OnePole(a, np.float64)
+        actual = np.concatenate(list(f.feedall(np.split(signal, [7, 30, 31, 64]))))
+        self.assertTrue(np.allclose(expected, actual))
+        self.assertAlmostEqual(expected[-1], f.y[0])
+
+    def test_return(self):
+        c = Counter()
+        self.assertEqual([0, 1, 2], list(c.feed(np.zeros(3, dtype = np.int32))))
+        self.assertEqual([3, 4], list(c.feed(np.array([1, -1, 1], dtype = np.int32))[:2]))
+        self.assertEqual(5, c.count[0])
+        self.assertEqual([5, 6], list(c.feed(np.zeros(2, dtype = np.int32))))
@@ -0,0 +1,55 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import PythonInLoopException
+from .leaf import turbo, T
+from unittest import TestCase
+import numpy as np
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T], y = [T], out = [T]), dynamic = True, strict = True)
+def tsum(n, x, y, out):
+    for i in range(n):
+        out[i] = x[i] + y[i]
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, x = [T]), dynamic = True, strict = True)
+def slow(n, x):
+    for i in range(n):
+        if x[i]:
+            x[i] = len(str(x[i]))
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32), strict = True)
+def triple(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc += 3
+    return acc
+
+class TestStrict(TestCase):
+
+    def test_works(self):
+        x = np.arange(5, dtype = np.float32)
+        out = np.empty(5, dtype = np.float32)
+        tsum(5, x, x, out)
+        self.assertEqual([0, 2, 4, 6, 8], list(out))
+        self.assertEqual(21, triple(7))
+
+    def test_failure(self):
+        try:
+            slow[T, np.float32]
+            self.fail('Expected Python in loop.')
+        except PythonInLoopException as e:
+            self.assertEqual(('slow', f"{__file__}:32", 'x[i] = len(str(x[i]))'), e.args)
@@ -0,0 +1,61 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .leaf import turbo, T
+from .model import Struct
+from unittest import TestCase
+import numpy as np
+
+rectype = np.dtype([('t', 'f8'), ('v', 'f4'), ('flag', 'u1')])
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, rec = rectype, acc = np.float64))
+def flagged(n, rec):
+    acc = 0
+    for i in range(n):
+        if rec[i].flag:
+            acc += rec[i].t * rec[i].v
+    return acc
+
+@turbo(types = dict(i = np.uint32, n = np.uint32, rec = Struct([('t', np.float64), ('v', T)]), k = T), dynamic = True)
+def scalev(n, rec, k):
+    for i in range(n):
+        rec[i].v *= k
+
+class TestStruct(TestCase):
+
+    def test_dtype(self):
+        rec = np.zeros(4, dtype = rectype)
+        rec['t'] = 1, 2, 3, 4
+        rec['v'] = 10, 20, 30, 40
+        rec['flag'] = 1, 0, 1, 0
+        self.assertEqual(100, flagged(np.uint32(4), rec))
+
+    def test_placeholder(self):
+        for vtype in np.float32, np.int16:
+            rec = np.zeros(3, dtype = [('t', 'f8'), ('v', vtype)])
+            rec['v'] = 1, 2, 3
+            scalev(np.uint32(3), rec, vtype(2)) # Writes through to the original buffer.
+            self.assertEqual([2, 4, 6], list(rec['v']))
+        self.assertEqual('scalev_int16', scalev[T, np.int16].info.functionname)
+
+    def test_aligned(self):
+        dtype = np.dtype([('t', 'f8'), ('v', 'f4'), ('flag', 'u1')], align = True)
+        self.assertEqual(Struct([('t', np.float64), ('v', np.float32), ('flag', np.uint8)], True), Struct.fromdtype(dtype))
+        self.assertNotEqual(Struct.fromdtype(dtype), Struct.fromdtype(rectype))
+        rec = np.zeros(2, dtype = dtype)
+        with self.assertRaises(ValueError):
+            flagged(np.uint32(2), rec) # Layout mismatch is caught by the buffer check.
@@ -0,0 +1,107 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import BadArgException, NotTileableException
+from .leaf import LOCAL, turbo, T
+from unittest import TestCase
+import numpy as np
+
+@turbo(types = dict(a = [[T]], b = [[T]], i = np.intp, j = np.intp), dynamic = True)
+def transpose(a, b):
+    i = LOCAL
+    j = LOCAL
+    a_shape0 = LOCAL
+    a_shape1 = LOCAL
+    a_stride0 = LOCAL
+    a_stride1 = LOCAL
+    b_stride0 = LOCAL
+    b_stride1 = LOCAL
+    for TILE in range(8):
+        for i in range(a_shape0):
+            for j in range(a_shape1):
+                b[j * b_stride0 + i * b_stride1] = a[i * a_stride0 + j * a_stride1]
+
+@turbo(types = dict(a = [[[T]]], i = np.intp, j = np.intp, k = np.intp, total = T), dynamic = True)
+def cubesum(a):
+    i = LOCAL
+    j = LOCAL
+    k = LOCAL
+    a_shape0 = LOCAL
+    a_shape1 = LOCAL
+    a_shape2 = LOCAL
+    a_stride0 = LOCAL
+    a_stride1 = LOCAL
+    a_stride2 = LOCAL
+    total = 0
+    for TILE in range(4):
+        for i in range(a_shape0):
+            for j in range(1, a_shape1):
+                for k in range(a_shape2):
+                    total += a[i * a_stride0 + j * a_stride1 + k * a_stride2]
+    return total
+
+@turbo(types = dict(a = [T], i = np.intp), dynamic = True)
+def shallow(a):
+    i = LOCAL
+    for TILE in range(8):
+        for i in range(10):
+            a[i] = i
+
+@turbo(types = dict(a = [[T]], i = np.intp, j = np.intp, n = np.intp), dynamic = True)
+def triangle(a, n):
+    i = LOCAL
+    j = LOCAL
+    a_stride0 = LOCAL
+    a_stride1 = LOCAL
+    for TILE in range(8):
+        for i in range(n):
+            for j in range(i, n):
+                a[i * a_stride0 + j * a_stride1] = 1
+
+class TestTile(TestCase):
+
+    def test_transpose(self):
+        a = np.arange(13 * 21, dtype = np.float64).reshape(13, 21)
+        b = np.zeros((21, 13))
+        transpose(a, b)
+        self.assertTrue(np.array_equal(a.T, b))
+        text = transpose[T, np.float64].source()
+        self.assertIn('a_shape0 =', text)
+        self.assertNotIn('b_shape0', text) # Not referenced by the body.
+
+    def test_strided(self):
+        a = np.arange(20 * 30, dtype = np.int32).reshape(20, 30)[::2, 1::3]
+        b = np.zeros((10, 10), dtype = np.int32)
+        transpose(a, b)
+        self.assertTrue(np.array_equal(a.T, b))
+
+    def test_fieldview(self):
+        a = np.zeros((3, 4), dtype = [('x', np.int32), ('y', np.int16)])['x'] # Strides of 6 bytes, not a whole number of elements.
+        with self.assertRaises(BadArgException):
+            transpose(a, np.zeros((4, 3), dtype = np.int32))
+
+    def test_3d(self):
+        a = np.arange(5 * 7 * 9, dtype = np.int64).reshape(5, 7, 9)
+        self.assertEqual(a[:, 1:].sum(), cubesum(a))
+
+    def test_shallow(self):
+        with self.assertRaises(NotTileableException):
+            shallow(np.zeros(10, dtype = np.int32))
+
+    def test_triangle(self):
+        with self.assertRaises(NotTileableException):
+            triangle(np.zeros((10, 10), dtype = np.int32), 10)
@@ -0,0 +1,102 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import unroll
+from .leaf import turbo
+from .unroll import Binary, CompilerUnroll, Remainder
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np
+
+def pytriple(n):
+    acc = 0
+    for _ in range(n):
+        acc = (acc * 3 + 1) & 0xffffffff
+    return acc
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32), unroll = Binary())
+def binary(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32), unroll = Binary(4))
+def binary4(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32), unroll = Remainder(3))
+def remainder(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+
+@turbo(types = dict(n = np.uint32, acc = np.uint32), unroll = CompilerUnroll(4))
+def compilerunroll(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+
+@turbo(types = dict(n = np.int32, acc = np.uint32), unroll = Remainder(3))
+def signedremainder(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+
+@turbo(types = dict(n = np.int32, acc = np.uint32), unroll = CompilerUnroll(4))
+def signedcompilerunroll(n):
+    acc = 0
+    for UNROLL in range(n):
+        acc = acc * 3 + 1
+    return acc
+
+class TestUnroll(TestCase):
+
+    def test_works(self):
+        for n in range(300):
+            expected = pytriple(n)
+            for f in binary, binary4, remainder, compilerunroll:
+                self.assertEqual(expected, f(n))
+
+    def test_source(self):
+        self.assertEqual(255, binary.source().count('acc = acc * 3 + 1'))
+        self.assertEqual(7, binary4.source().count('acc = acc * 3 + 1'))
+        text = remainder.source()
+        self.assertIn('    while n >= 3:\n', text)
+        self.assertEqual(4, text.count('acc = acc * 3 + 1'))
+        self.assertEqual(1, compilerunroll.source().count('acc = acc * 3 + 1'))
+        with patch.object(unroll, 'isgcc', lambda: True):
+            self.assertEqual(['-funroll-loops', '--param', 'max-unroll-times=4'], compilerunroll.info.unroll.compileargs())
+
+    def test_negative(self):
+        for n in -5, -1, 0, 5:
+            for f in signedremainder, signedcompilerunroll:
+                self.assertEqual(pytriple(max(n, 0)), f(n))
+
+    def test_notgcc(self):
+        with patch.object(unroll, 'isgcc', lambda: False):
+            self.assertEqual([], CompilerUnroll(4).compileargs())
+
+    def test_badmaxchunk(self):
+        with self.assertRaises(ValueError):
+            Binary(6)
@@ -17,13 +17,8 @@
 
 from .leaf import turbo, T
 from .model import Deferred, nocompile
-from hashlib import md5
-from socket import getfqdn
 from unittest import TestCase
-import numpy as np, sys, time
-
-def _stderr(*args):
-    print(*args, file = sys.stderr)
+import numpy as np
 
 def pysum(n, x, y, out):
     for i in range(n):
@@ -95,37 +90,6 @@ class TestDeferred(TestCase):
         with nocompile:
             d.f
 
-class TestSpeed(TestCase):
-
-    excludeexps = {4, 5} if 'ad566fda18c44300e1515aef7ed59695' == md5(getfqdn().encode()).hexdigest() else set()
-    maxexp = 6
-    minwins = .8
-    reftask = staticmethod(npsum)
-    trials = 100
-
-    def _compare(self, task, size):
-        x = np.arange(size, dtype = np.float32)
-        y = np.arange(size, dtype = np.float32) * 2
-        out = np.empty(size, dtype = np.float32)
-        n = 0
-        for _ in range(self.trials):
-            mark = time.time()
-            self.reftask(size, x, y, out)
-            (reftime, mark), = ((t - mark, t) for t in [time.time()])
-            task(size, x, y, out)
-            n += time.time() - mark <= reftime
-        return n / self.trials
-
-    def test_fastenough(self):
-        for exp in range(self.maxexp + 1):
-            size = 10 ** exp
-            _stderr(f"size: {size}")
-            for task in tsum, gsum[T, np.float32]:
-                wins = self._compare(task, size)
-                _stderr(f"{task} wins: {wins}")
-                if exp not in self.excludeexps:
-                    self.assertGreaterEqual(wins, self.minwins)
-
 @turbo(n = np.uint32, acc = np.uint32)
 def triple(n):
     acc = 0
@@ -0,0 +1,78 @@
+# Copyright 2015, 2016, 2017, 2020 Andrzej Cichocki
+
+# This file is part of pyrbo.
+#
+# pyrbo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyrbo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import NotTileableException
+from .frontend import Pass
+from copy import deepcopy
+import ast
+
+def _rangeargs(loop):
+    if not (isinstance(loop, ast.For) and isinstance(loop.target, ast.Name) and not loop.orelse
+            and isinstance(loop.iter, ast.Call) and isinstance(loop.iter.func, ast.Name) and 'range' == loop.iter.func.id
+            and len(loop.iter.args) in {1, 2} and not loop.iter.keywords):
+        return
+    args = loop.iter.args
+    return (ast.Constant(0), *args) if 1 == len(args) else args
+
+class Tile(Pass):
+
+    maxdepth = 3
+
+    def __init__(self):
+        self.declared = {}
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        if not (isinstance(node.target, ast.Name) and 'TILE' == node.target.id):
+            return node
+        text = ast.unparse(node).splitlines()[0]
+        args = _rangeargs(node)
+        if args is None or 1 != len(node.iter.args) or 1 != len(node.body):
+            raise NotTileableException(text)
+        size, = node.iter.args
+        loops = []
+        body = node.body
+        while len(loops) < self.maxdepth and 1 == len(body) and _rangeargs(body[0]) is not None:
+            loops.append(body[0])
+            body = body[0].body
+        if len(loops) < 2:
+            raise NotTileableException(text)
+        targets = {loop.target.id for loop in loops}
+        for loop in loops: # Hoisted tile loops can't depend on an enclosing target, so triangular nests are out.
+            if targets & {n.id for a in _rangeargs(loop) for n in ast.walk(a) if isinstance(n, ast.Name)}:
+                raise NotTileableException(text)
+        outer = []
+        for loop in loops:
+            variable = loop.target.id
+            self.declared[f"{variable}_tile"] = variable, None
+        for loop in loops: # Tile loops outermost, same order.
+            start, stop = _rangeargs(loop)
+            outer.append(ast.For(
+                target = ast.Name(f"{loop.target.id}_tile", ast.Store()),
+                iter = ast.Call(ast.Name('range', ast.Load()), [deepcopy(start), deepcopy(stop), deepcopy(size)], []),
+                body = [], orelse = []))
+        inner = []
+        for loop in loops:
+            _, stop = _rangeargs(loop)
+            tilestart = ast.Name(f"{loop.target.id}_tile", ast.Load())
+            tilestop = ast.Call(ast.Name('min', ast.Load()), [ast.BinOp(deepcopy(tilestart), ast.Add(), deepcopy(size)), deepcopy(stop)], [])
+            inner.append(ast.For(target = deepcopy(loop.target), iter = ast.Call(ast.Name('range', ast.Load()), [tilestart, tilestop], []), body = [], orelse = []))
+        nest = outer + inner
+        for parent, child in zip(nest, nest[1:]):
+            parent.body = [child]
+        nest[-1].body = body
+        return ast.fix_missing_locations(ast.copy_location(nest[0], node))
@@ -15,48 +15,108 @@
 # You should have received a copy of the GNU General Public License
 # along with pyrbo.  If not, see <http://www.gnu.org/licenses/>.
 
-from io import StringIO
-import re
+from .frontend import Pass
+from copy import deepcopy
+import ast, re
 
-pattern = re.compile(r'^(\s*)for\s+UNROLL\s+in\s+range\s*\(\s*([^\s]+)\s*\)\s*:\s*$')
-indentregex = re.compile(r'^\s*')
 maxchunk = 0x80
 
-def unroll(body, g, consts, eol):
-    f = StringIO(body)
-    buffer = []
-    while True:
-        line = buffer.pop(0) if buffer else f.readline()
-        if not line:
-            break
-        m = pattern.search(line)
-        if m is None:
-            g.append(line)
-            continue
-        outerindent = m.group(1)
-        variable = m.group(2)
-        line = f.readline()
-        m = indentregex.search(line)
-        innerindent = m.group()
-        body = []
-        while line.startswith(innerindent):
-            body.append(line)
-            line = f.readline()
-        buffer.append(line)
-        if variable in consts:
-            for _ in range(consts[variable]):
-                for line in body:
-                    g.append(f"{outerindent}{line[len(innerindent):]}")
-        else:
-            mask = 0x01
-            while mask < maxchunk:
-                g.append("%sif %s & 0x%x:%s" % (outerindent, variable, mask, eol))
-                for _ in range(mask):
-                    for line in body:
-                        g.append(line)
-                mask <<= 1
-            g.append("%swhile %s >= 0x%x:%s" % (outerindent, variable, maxchunk, eol))
-            for _ in range(maxchunk):
-                for line in body:
-                    g.append(line)
-            g.append("%s%s -= 0x%x%s" % (innerindent, variable, maxchunk, eol))
+def isgcc(): # Whether the resolved compiler understands GCC-only options.
+    from . import cache # Only needed to build, not to import pyrbo.
+    text = cache.compilerversion()
+    return 'Free Software Foundation' in text and 'clang' not in text
+
+def _copies(body, n):
+    return [deepcopy(s) for _ in range(n) for s in body]
+
+def _decrement(variable, n):
+    target = deepcopy(variable)
+    target.ctx = ast.Store()
+    return ast.AugAssign(target, ast.Sub(), ast.Constant(n))
+
+def _countdown(variable, body): # Not just while n, so a negative count does nothing rather than spin.
+    return ast.While(test = ast.Compare(deepcopy(variable), [ast.Gt()], [ast.Constant(0)]), body = _copies(body, 1) + [_decrement(variable, 1)], orelse = [])
+
+class Binary:
+
+    def __init__(self, maxchunk = maxchunk):
+        if maxchunk < 1 or maxchunk & (maxchunk - 1):
+            raise ValueError(maxchunk)
+        self.maxchunk = maxchunk
+
+    def expand(self, variable, body):
+        statements = []
+        mask = 0x01
+        while mask < self.maxchunk:
+            statements.append(ast.If(test = ast.BinOp(deepcopy(variable), ast.BitAnd(), ast.Constant(mask)), body = _copies(body, mask), orelse = []))
+            mask <<= 1
+        statements.append(ast.While(
+            test = ast.Compare(deepcopy(variable), [ast.GtE()], [ast.Constant(self.maxchunk)]),
+            body = _copies(body, self.maxchunk) + [_decrement(variable, self.maxchunk)],
+            orelse = [],
+        ))
+        return statements
+
+    def compileargs(self):
+        return []
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.maxchunk:#x})"
+
+class Remainder:
+
+    def __init__(self, factor = 8):
+        self.factor = factor
+
+    def expand(self, variable, body):
+        return [
+            ast.While(
+                test = ast.Compare(deepcopy(variable), [ast.GtE()], [ast.Constant(self.factor)]),
+                body = _copies(body, self.factor) + [_decrement(variable, self.factor)],
+                orelse = [],
+            ),
+            _countdown(variable, body),
+        ]
+
+    def compileargs(self):
+        return []
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.factor})"
+
+class CompilerUnroll:
+
+    def __init__(self, factor = 8):
+        self.factor = factor
+
+    def expand(self, variable, body):
+        # Cython gives us no way to put a pragma right before the C loop, so ask the compiler to unroll the module via flags:
+        return [_countdown(variable, body)]
+
+    def compileargs(self): # Without GCC this is just the plain loop.
+        return ['-funroll-loops', '--param', f"max-unroll-times={self.factor}"] if isgcc() else []
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.factor})"
+
+strategies = {s.__name__: s for s in [Binary, Remainder, CompilerUnroll]}
+
+def parsestrategy(text):
+    name, arg = re.fullmatch(r'([A-Za-z]+)\((.*)\)', text).groups()
+    return strategies[name](int(arg, 0))
+
+class Unroll(Pass):
+
+    def __init__(self, strategy):
+        self.strategy = strategy
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        if not (isinstance(node.target, ast.Name) and 'UNROLL' == node.target.id
+                and isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Name) and 'range' == node.iter.func.id
+                and 1 == len(node.iter.args) and not node.iter.keywords):
+            return node
+        variable, = node.iter.args
+        if isinstance(variable, ast.Constant):
+            return _copies(node.body, variable.value)
+        return [ast.fix_missing_locations(ast.copy_location(s, node)) for s in self.strategy.expand(variable, node.body)]